@@ -20,6 +20,7 @@ interface Match {
     rr: string | null;
     time: string | null;
     venue: string;
+    teams?: string[] | null;
 }
 
 const WinProbabilityGauge = ({ probability }: { probability: number }) => {
@@ -63,6 +64,7 @@ export default function LiveMatrix() {
     const [selections, setSelections] = useState<Record<string, TeamSelection>>({});
     const [results, setResults] = useState<Record<string, any>>({});
     const [simulating, setSimulating] = useState<Record<string, boolean>>({});
+    const [simErrors, setSimErrors] = useState<Record<string, string>>({});
 
     const fetchMatches = async () => {
         setLoading(true);
@@ -82,13 +84,42 @@ export default function LiveMatrix() {
         setLoading(false);
     };
 
+    const applyDiff = (changed: Match[], removed: string[]) => {
+        setMatches((prev) => {
+            const byId = new Map(prev.map((m) => [m.id, m]));
+            removed.forEach((id) => byId.delete(id));
+            changed.forEach((m) => byId.set(m.id, m));
+            return Array.from(byId.values());
+        });
+        setLastSync(0);
+    };
+
     useEffect(() => {
         fetchMatches();
         const syncInterval = setInterval(() => setLastSync((prev) => prev + 1), 1000);
-        const pollInterval = setInterval(() => fetchMatches(), 25000); // Poll Endpoint every 25s
+
+        // Server pushes a snapshot on connect, then only changed matches
+        let pollInterval: ReturnType<typeof setInterval> | null = null;
+        const stream = new EventSource("http://localhost:8000/match-stream");
+        stream.addEventListener("snapshot", (e) => {
+            setMatches(JSON.parse((e as MessageEvent).data).matches);
+            setLastSync(0);
+            setLoading(false);
+        });
+        stream.addEventListener("diff", (e) => {
+            const { changed, removed } = JSON.parse((e as MessageEvent).data);
+            applyDiff(changed, removed);
+        });
+        stream.onerror = () => {
+            // Stream unavailable -> fall back to polling the endpoint every 25s
+            if (stream.readyState === EventSource.CLOSED && !pollInterval) {
+                pollInterval = setInterval(() => fetchMatches(), 25000);
+            }
+        };
         return () => {
+            stream.close();
             clearInterval(syncInterval);
-            clearInterval(pollInterval);
+            if (pollInterval) clearInterval(pollInterval);
         };
     }, []);
 
@@ -97,6 +128,7 @@ export default function LiveMatrix() {
         if (!selection) return;
 
         setSimulating((prev) => ({ ...prev, [match.id]: true }));
+        setSimErrors((prev) => ({ ...prev, [match.id]: "" }));
         try {
             const res = await fetch("http://localhost:8000/live-prediction", {
                 method: "POST",
@@ -106,9 +138,15 @@ export default function LiveMatrix() {
             if (res.ok) {
                 const data = await res.json();
                 setResults((prev) => ({ ...prev, [match.id]: data }));
+            } else {
+                // e.g. 422 when the feed has no overs for the current innings, 503 with no model
+                const body = await res.json().catch(() => null);
+                const detail = typeof body?.detail === "string" ? body.detail : `Live prediction failed (HTTP ${res.status}).`;
+                setSimErrors((prev) => ({ ...prev, [match.id]: detail }));
             }
         } catch (error) {
             console.warn("Failed live prediction - is the Python backend running?");
+            setSimErrors((prev) => ({ ...prev, [match.id]: "Could not reach the prediction backend." }));
         }
         setSimulating((prev) => ({ ...prev, [match.id]: false }));
     };
@@ -281,6 +319,11 @@ export default function LiveMatrix() {
                                                         >
                                                             {isSimulating ? <Spinner size={16} /> : "Initialize Tactical Run"}
                                                         </motion.button>
+                                                        {simErrors[match.id] && (
+                                                            <p className="text-xs text-red-400 bg-red-500/10 border border-red-500/20 rounded-xl p-3">
+                                                                {simErrors[match.id]}
+                                                            </p>
+                                                        )}
                                                     </motion.div>
                                                 ) : (
                                                     <motion.div
@@ -1,15 +1,266 @@
 import os
 import datetime
-import requests
+import asyncio
+import time
+import json
+import re
+import hashlib
+import httpx
+from contextlib import asynccontextmanager
+from collections import deque
 from bs4 import BeautifulSoup
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import ClassVar, List, Optional
 import xml.etree.ElementTree as ET
-import random
 
-app = FastAPI(title="NeuroPitch AI Tactical Brain API", version="5.0")
+# Upstream sources (overridable so tests can point them at local stand-ins)
+CRICAPI_URL = os.getenv("CRICAPI_URL", "https://api.cricapi.com/v1/matches")
+CRICINFO_RSS_URL = os.getenv("CRICINFO_RSS_URL", "http://static.cricinfo.com/rss/livescores.xml")
+CRICBUZZ_URL = os.getenv("CRICBUZZ_URL", "https://www.cricbuzz.com/cricket-match/live-scores")
+SCRAPE_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+
+# Per-source timeouts (seconds) and match-list cache policy
+SOURCE_TIMEOUTS = {"cricapi": 5.0, "rss": 5.0, "cricbuzz": 5.0}
+MATCHES_TTL = float(os.getenv("MATCHES_TTL", "20"))
+MATCHES_MAX_STALE = float(os.getenv("MATCHES_MAX_STALE", "300"))
+
+# Background poller / push stream (interval <= 0 disables the poller)
+POLL_INTERVAL = float(os.getenv("MATCH_POLL_INTERVAL", "15"))
+STREAM_HEARTBEAT = 15.0
+STREAM_HISTORY = 64
+# A fixture keeps the UTC date it was first seen on (and so its id) until it has been
+# missing from every feed for this long (seconds)
+FIXTURE_DATE_TTL = float(os.getenv("FIXTURE_DATE_TTL", str(12 * 3600)))
+
+# Live prediction engine: sims per tactic and micro-batching policy
+LIVE_N_SIMS = int(os.getenv("LIVE_N_SIMS", "2000"))
+BATCH_WINDOW = float(os.getenv("PREDICTION_BATCH_WINDOW_MS", "5")) / 1000
+BATCH_MAX = int(os.getenv("PREDICTION_BATCH_MAX", "64"))
+LIVE_TACTICS = {
+    "Baseline": None,
+    "Accelerate (Target Boundaries)": {"batting": "accelerate"},
+    "Consolidate (Rotate Strike)": {"batting": "rotate"},
+    "Attack (Bring Fielders In)": {"intent": "attack"},
+    "Defend (Spread Field)": {"intent": "defend"},
+    "Bowl Wide Yorkers": {"bowler_type": "yorker_specialist"}
+}
+# Tactics each side can actually choose (all are simulated; only these are ranked)
+TACTIC_ROLES = {
+    "batting": ("Accelerate (Target Boundaries)", "Consolidate (Rotate Strike)"),
+    "fielding": ("Attack (Bring Fielders In)", "Defend (Spread Field)", "Bowl Wide Yorkers")
+}
+MAX_SCORE = 500
+
+class SWRCache:
+    """
+    Shared async TTL cache with stale-while-revalidate.
+    Fresh entries are served from memory; stale ones (up to max_stale) are served
+    immediately while a single background refresh runs; anything older waits for a
+    refresh. Concurrent misses share one in-flight load per key.
+    """
+    def __init__(self, ttl, max_stale):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries = {}
+        self._inflight = {}
+
+    async def get(self, key, loader):
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            value, fetched_at = entry
+            age = now - fetched_at
+            if age < self.ttl:
+                return value
+            if age < self.max_stale:
+                self._refresh(key, loader)
+                return value
+        return await self._refresh(key, loader)
+
+    def _refresh(self, key, loader):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key, loader):
+        try:
+            value = await loader()
+            self._entries[key] = (value, time.monotonic())
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+
+    def clear(self):
+        self._entries.clear()
+
+match_cache = SWRCache(ttl=MATCHES_TTL, max_stale=MATCHES_MAX_STALE)
+
+def diff_matches(previous, current):
+    """Returns (changed, removed): matches that are new or differ from `previous`, and ids that disappeared."""
+    changed = [m for m_id, m in current.items() if previous.get(m_id) != m]
+    removed = [m_id for m_id in previous if m_id not in current]
+    return changed, removed
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+class MatchBroadcaster:
+    """
+    Holds the latest match snapshot and publishes diffs against it.
+    Each diff is serialized once and kept in a short versioned history; publishing
+    only swaps a shared asyncio.Event, so its cost does not depend on how many
+    subscribers are connected. Subscribers wake up, read the shared history and
+    fall back to a full snapshot if they lagged behind it.
+    """
+    def __init__(self, history=STREAM_HISTORY):
+        self.snapshot = {}
+        self.version = 0
+        self._history = deque(maxlen=history)
+        self._changed = asyncio.Event()
+
+    def publish(self, matches):
+        current = {m["id"]: m for m in matches}
+        changed, removed = diff_matches(self.snapshot, current)
+        self.snapshot = current
+        if not changed and not removed:
+            return False
+        self.version += 1
+        self._history.append((self.version, sse_event("diff", {"version": self.version, "changed": changed, "removed": removed})))
+        # Wake every waiting subscriber at once, then arm a fresh event for the next update
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return True
+
+    def snapshot_event(self):
+        return sse_event("snapshot", {"version": self.version, "matches": sort_by_status(self.snapshot.values())})
+
+    async def subscribe(self, heartbeat=STREAM_HEARTBEAT):
+        """Yields encoded SSE frames: one snapshot, then diffs (or heartbeats) as they arrive."""
+        seen = self.version
+        yield self.snapshot_event()
+        while True:
+            changed = self._changed
+            if self.version == seen:
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+            pending = [(v, frame) for v, frame in self._history if v > seen]
+            if not pending or pending[0][0] != seen + 1:
+                # Missed diffs that already left the history window -> resync
+                yield self.snapshot_event()
+            else:
+                for _, frame in pending:
+                    yield frame
+            seen = self.version
+
+broadcaster = MatchBroadcaster()
+
+async def poll_matches(app, interval=POLL_INTERVAL):
+    """Refreshes match state on a fixed schedule, primes the cache and pushes diffs."""
+    while True:
+        try:
+            matches = await aggregate_today_matches(app.state.http_client)
+            match_cache.set("today", matches)
+            broadcaster.publish(matches)
+        except Exception as e:
+            print(f"Match poller error: {e!r}")
+        await asyncio.sleep(interval)
+
+def load_engine():
+    """Loads the trained model once; returns a MatchSimulator, or None if no model has been trained."""
+    from src.models import NeuroPredictor
+    from src.simulator import MatchSimulator
+    model = NeuroPredictor()
+    if not model.load_model():
+        print("No trained model found - /live-prediction disabled (run src/models.py first)")
+        return None
+    return MatchSimulator(model=model)
+
+def load_chase_table():
+    """Precomputed chase win-probability table (src/win_table.py), or None if not built yet."""
+    from src.win_table import load_win_table
+    return load_win_table()
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent prediction requests into micro-batches.
+    The first queued request opens a window of `window` seconds (or until `max_batch`
+    requests arrive); the whole batch then gets one model call and one simulation
+    pass in a worker thread, so the event loop stays responsive.
+    """
+    def __init__(self, simulator, tactics, n_sims=LIVE_N_SIMS, window=BATCH_WINDOW, max_batch=BATCH_MAX):
+        self.simulator = simulator
+        self.tactics = tactics
+        self.n_sims = n_sims
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+
+    async def submit(self, state):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((state, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = await asyncio.to_thread(self.simulator.simulate_tactics_batch,
+                                                  [state for state, _ in batch], list(self.tactics.values()), self.n_sims)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(dict(zip(self.tactics, result)))
+
+@asynccontextmanager
+async def lifespan(app):
+    # One pooled HTTP client for all upstream calls
+    app.state.http_client = httpx.AsyncClient(
+        headers=SCRAPE_HEADERS,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    )
+    poller = asyncio.create_task(poll_matches(app)) if POLL_INTERVAL > 0 else None
+    
+    # Model is loaded once; requests share it through the micro-batcher
+    simulator = await asyncio.to_thread(load_engine)
+    app.state.batcher = PredictionBatcher(simulator, LIVE_TACTICS) if simulator is not None else None
+    batch_worker = asyncio.create_task(app.state.batcher.run()) if app.state.batcher is not None else None
+    app.state.win_table = await asyncio.to_thread(load_chase_table)
+    try:
+        yield
+    finally:
+        for task in (poller, batch_worker):
+            if task is not None:
+                task.cancel()
+        await app.state.http_client.aclose()
+
+app = FastAPI(title="NeuroPitch AI Tactical Brain API", version="5.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,149 +278,388 @@ class Match(BaseModel):
     rr: Optional[str] = None
     time: Optional[str] = None
     venue: Optional[str] = "Unknown Venue"
+    teams: Optional[List[str]] = None
 
 class LivePredictionRequest(BaseModel):
     match_id: str
     selected_team: str
-    role: str
+    role: str = Field(pattern=r"(?i)^(batting|fielding)$")
+    # Current match state. When none of these are sent, the latest stored score of
+    # match_id is used; otherwise defaults describe the first ball of a first innings.
+    innings: int = Field(1, ge=1, le=2)
+    overs_done: int = Field(0, ge=0, le=20)
+    balls_done: int = Field(0, ge=0, le=5)
+    wickets_lost: int = Field(0, ge=0, le=10)
+    current_score: int = Field(0, ge=0, le=MAX_SCORE)
+    target: Optional[int] = Field(None, ge=0, le=MAX_SCORE)
+    batter: Optional[str] = None
+    bowler: Optional[str] = None
 
-def fetch_cricapi_matches():
-    api_key = os.getenv("CRICKET_API_KEY", "YOUR_CRICKETDATA_KEY")
-    today = datetime.date.today().isoformat()
-    if api_key == "YOUR_CRICKETDATA_KEY":
+    STATE_FIELDS: ClassVar[tuple] = ("innings", "overs_done", "balls_done", "wickets_lost", "current_score", "target")
+
+    def has_state(self):
+        return any(f in self.model_fields_set for f in self.STATE_FIELDS)
+
+    def innings_complete(self):
+        """Overs used up, all out, or target already passed: nothing left to simulate."""
+        chased = self.innings == 2 and self.target is not None and self.current_score > self.target
+        return self.overs_done * 6 + self.balls_done >= 120 or self.wickets_lost >= 10 or chased
+
+    def sim_state(self):
+        chasing = self.innings == 2 and self.target is not None
+        return {
+            'overs_done': self.overs_done,
+            'balls_done': self.balls_done,
+            'wickets_lost': self.wickets_lost,
+            'target': self.target if chasing else 9999,
+            'current_score': self.current_score,
+            'batter': self.batter,
+            'bowler': self.bowler
+        }
+
+def sort_by_status(matches):
+    return sorted(matches, key=lambda x: 0 if x["status"] == "live" else (1 if x["status"] == "upcoming" else 2))
+
+# --- Match identity ---
+
+TEAM_SPLIT = re.compile(r"\s+vs?\.?\s+", re.IGNORECASE)
+PLACEHOLDER_VALUES = ("", "Unknown", "Unknown Venue", "International Venue", "Today", "Ongoing")
+
+def is_placeholder(value):
+    return value is None or (isinstance(value, str) and value in PLACEHOLDER_VALUES)
+
+def normalize_team(name):
+    """'Australia 250/6 *' -> 'australia': keeps the leading team words, drops scores and punctuation."""
+    head = re.match(r"[^\d/*(]*", name).group(0)
+    return " ".join(re.sub(r"[^a-z ]", " ", head.lower()).split())
+
+def split_teams(title):
+    """Team names from a fixture title ('India v Australia 120/3*', 'Kenya vs Nepal, 3rd Match')."""
+    parts = TEAM_SPLIT.split(title.split(",")[0], maxsplit=1)
+    if len(parts) != 2:
         return None
+    teams = [normalize_team(p) for p in parts]
+    return teams if all(teams) else None
+
+def match_key(teams, date=None):
+    """
+    Source-independent key: sorted normalized team names plus match date. The date defaults
+    to the one the fixture was first seen on (MatchStore.fixture_date), whichever feed
+    reports it, so the key survives midnight and agrees across sources.
+    """
+    fixture = "|".join(sorted(normalize_team(t) for t in teams))
+    return f"{date or match_store.fixture_date(fixture)}|{fixture}"
+
+def match_id(teams, date=None):
+    return "m_" + hashlib.sha1(match_key(teams, date).encode()).hexdigest()[:12]
+
+def with_identity(match, teams, date=None, fallback=None):
+    """Attaches a deterministic id (and normalized teams); unparseable titles hash their name instead."""
+    if teams:
+        match["id"] = match_id(teams, date)
+        match["teams"] = sorted(normalize_team(t) for t in teams)
+    else:
+        fixture = fallback or match['name']
+        match["id"] = "m_" + hashlib.sha1(f"{date or match_store.fixture_date(fixture)}|{fixture}".encode()).hexdigest()[:12]
+        match["teams"] = None
+    return match
+
+def cricapi_key():
+    api_key = os.getenv("CRICKET_API_KEY", "YOUR_CRICKETDATA_KEY")
+    return None if api_key == "YOUR_CRICKETDATA_KEY" else api_key
+
+def cricapi_params(api_key):
+    return {"apikey": api_key, "offset": 0, "date": datetime.date.today().isoformat()}
+
+def parse_cricapi(data):
+    matches = []
+    for idx, m in enumerate(data.get("data", [])):
+        status_raw = m.get("status", "").lower()
+        status = "live" if "live" in status_raw or "ongoing" in status_raw or "stumps" in status_raw else ("completed" if "won" in status_raw or "result" in status_raw else "upcoming")
         
-    url = f"https://api.cricapi.com/v1/matches?apikey={api_key}&offset=0&date={today}"
-    try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            matches = []
-            for idx, m in enumerate(data.get("data", [])):
-                status_raw = m.get("status", "").lower()
-                status = "live" if "live" in status_raw or "ongoing" in status_raw or "stumps" in status_raw else ("completed" if "won" in status_raw or "result" in status_raw else "upcoming")
-                
-                # Match user's required score format roughly
-                score_str = m.get("score", [{}])[0].get("r", "") if m.get("score") else None
-                matches.append({
-                    "id": str(m.get("id", idx)),
-                    "name": m.get("name", "Unknown Match"),
-                    "status": status,
-                    "score": score_str,
-                    "time": m.get("dateTimeGMT", "Ongoing"),
-                    "venue": m.get("venue", "Unknown Venue")
-                })
-            return sorted(matches, key=lambda x: 0 if x["status"] == "live" else (1 if x["status"] == "upcoming" else 2))
-    except Exception as e:
-        print(f"API Error: {e}")
-    return None
+        # One "runs/wickets (overs ov)" entry per innings, in innings order
+        score_str = " | ".join(f"{s.get('r', 0)}/{s.get('w', 0)} ({s.get('o', 0)} ov)" for s in m.get("score") or []) or None
+        name = m.get("name", "Unknown Match")
+        matches.append(with_identity({
+            "name": name,
+            "status": status,
+            "score": score_str,
+            "time": m.get("dateTimeGMT", "Ongoing"),
+            "venue": m.get("venue", "Unknown Venue")
+        }, m.get("teams") or split_teams(name), fallback=str(m.get("id", idx))))
+    return sort_by_status(matches)
 
-def scrape_fallback_matches():
+def parse_rss(text):
     matches = []
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    
-    # 1. Fallback to RSS (Most reliable for live data globally)
-    try:
-        res = requests.get("http://static.cricinfo.com/rss/livescores.xml", timeout=5)
-        if res.status_code == 200:
-            root = ET.fromstring(res.text)
-            for item in root.findall(".//item"):
-                title = item.find("title").text if item.find("title") is not None else ""
-                
-                if " v " in title:
-                    status = "live" if ("/" in title or "*" in title) else "upcoming"
-                    score_match = title if status == "live" else None
-                    name = title.replace("*", "").strip()
-                    
-                    matches.append({
-                        "id": f"rss_{random.randint(1000,9999)}",
-                        "name": name,
-                        "status": status,
-                        "score": score_match,
-                        "rr": None,
-                        "time": "Today",
-                        "venue": "International Venue"
-                    })
-    except Exception as e:
-        print(f"RSS Scrape Error: {e}")
+    root = ET.fromstring(text)
+    for item in root.findall(".//item"):
+        title = item.find("title").text if item.find("title") is not None else ""
+        
+        if " v " in title:
+            status = "live" if ("/" in title or "*" in title) else "upcoming"
+            score_match = title if status == "live" else None
+            name = title.replace("*", "").strip()
+            
+            matches.append(with_identity({
+                "name": name,
+                "status": status,
+                "score": score_match,
+                "rr": None,
+                "time": "Today",
+                "venue": "International Venue"
+            }, split_teams(title)))
+    return matches
+
+def parse_cricbuzz(html):
+    matches = []
+    soup = BeautifulSoup(html, "lxml" if "lxml" in BeautifulSoup.__module__ else "html.parser")
+    for match_box in soup.find_all("div", class_="cb-mtch-lst cb-col cb-col-100 cb-tms-itm"):
+        title_elem = match_box.find("h3", class_="cb-lv-scr-mtch-hdr")
+        score_elem = match_box.find("div", class_="cb-scr-wll-chvrn cb-lv-scrs-col")
+        status_elem = match_box.find("div", class_="cb-text-live") or match_box.find("div", class_="cb-text-complete")
+        
+        if title_elem:
+            title_text = title_elem.text.strip()
+            status_text = status_elem.text.lower().strip() if status_elem else "upcoming"
+            status = "live" if "live" in status_text or "stumps" in status_text else ("completed" if "won" in status_text else "upcoming")
+            score = score_elem.text.strip() if score_elem and status == "live" else None
+            
+            matches.append(with_identity({
+                "name": title_text,
+                "status": status,
+                "score": score,
+                "rr": None,
+                "time": "Today",
+                "venue": "Unknown"
+            }, split_teams(title_text)))
+    return matches
+
+def merge_matches(*sources):
+    """
+    Hash-indexed merge keyed by match id. Sources are given in priority order:
+    the first source to report a match owns its fields, later ones only fill in
+    missing or placeholder values.
+    """
+    merged = {}
+    for matches in sources:
+        for m in matches or []:
+            current = merged.get(m["id"])
+            if current is None:
+                merged[m["id"]] = dict(m)
+                continue
+            for field, value in m.items():
+                if is_placeholder(current.get(field)) and not is_placeholder(value):
+                    current[field] = value
+    return sort_by_status(merged.values())
+
+SCORE_ENTRY = re.compile(r"(?<![\w.])(\d{1,3})(?:/(\d{1,2}))?(?:\s*\((\d{1,2})(?:\.(\d))?\s*(?:ov|overs)?\))?")
+
+def parse_score_state(score):
+    """
+    Live state from a stored score string ('India 150/3 (16.2 ov) | ...', 'A 180/6 v B 95/2 (11.4)'):
+    innings entries are runs with wickets and/or overs, in innings order. Returns the
+    LivePredictionRequest state fields, or None when the current innings' overs are unknown.
+    """
+    entries = [m for m in SCORE_ENTRY.finditer(score or "") if m.group(2) or m.group(3)][:2]
+    if not entries:
+        return None
+    current = entries[-1]
+    if current.group(3) is None:
+        return None
+    overs, balls = int(current.group(3)), int(current.group(4) or 0)
+    return {
+        "innings": 2 if len(entries) > 1 else 1,
+        "overs_done": min(overs + balls // 6, 20),
+        "balls_done": balls % 6 if overs < 20 else 0,
+        "wickets_lost": min(int(current.group(2) or 0), 10),
+        "current_score": int(current.group(1)),
+        "target": int(entries[0].group(1)) if len(entries) > 1 else None
+    }
+
+class MatchStore:
+    """
+    Latest snapshot per match_id, with a per-match version bumped only when the match changes.
+    Also remembers the UTC date each fixture (team pair) was first seen, which all feeds
+    use for match ids.
+    """
+    def __init__(self, fixture_ttl=FIXTURE_DATE_TTL):
+        self._snapshots = {}
+        self._fixture_dates = {}
+        self.fixture_ttl = fixture_ttl
+
+    def fixture_date(self, fixture):
+        """UTC date (ISO) the fixture was first seen; forgotten once it goes unseen for fixture_ttl."""
+        now = time.time()
+        entry = self._fixture_dates.get(fixture)
+        if entry is None or now - entry["seen_at"] > self.fixture_ttl:
+            entry = {"date": datetime.datetime.now(datetime.timezone.utc).date().isoformat()}
+            self._fixture_dates[fixture] = entry
+        entry["seen_at"] = now
+        return entry["date"]
+
+    def update(self, matches):
+        now = time.time()
+        for m in matches:
+            entry = self._snapshots.get(m["id"])
+            if entry is None:
+                self._snapshots[m["id"]] = {"match": m, "version": 1, "updated_at": now}
+            elif entry["match"] != m:
+                entry.update(match=m, version=entry["version"] + 1, updated_at=now)
+        # Drop fixture dates no feed has reported for fixture_ttl (bounds the map)
+        self._fixture_dates = {f: e for f, e in self._fixture_dates.items() if now - e["seen_at"] <= self.fixture_ttl}
 
-    # 2. Cricbuzz Live page scrape
+    def get(self, match_id):
+        return self._snapshots.get(match_id)
+
+    def __contains__(self, match_id):
+        return match_id in self._snapshots
+
+match_store = MatchStore()
+
+# --- Async fetch layer ---
+
+async def fetch_cricapi_async(client):
+    api_key = cricapi_key()
+    if api_key is None:
+        return None
+    res = await client.get(CRICAPI_URL, params=cricapi_params(api_key))
+    return parse_cricapi(res.json()) if res.status_code == 200 else None
+
+async def fetch_rss_async(client):
+    res = await client.get(CRICINFO_RSS_URL)
+    return parse_rss(res.text) if res.status_code == 200 else []
+
+async def fetch_cricbuzz_async(client):
+    res = await client.get(CRICBUZZ_URL)
+    return parse_cricbuzz(res.text) if res.status_code == 200 else []
+
+async def _guarded(name, coro, default):
+    """Runs one source with its own timeout; a slow or failing source yields `default`."""
     try:
-        url = "https://www.cricbuzz.com/cricket-match/live-scores"
-        res = requests.get(url, headers=headers, timeout=5)
-        if res.status_code == 200:
-            soup = BeautifulSoup(res.text, "lxml" if "lxml" in BeautifulSoup.__module__ else "html.parser")
-            for match_box in soup.find_all("div", class_="cb-mtch-lst cb-col cb-col-100 cb-tms-itm"):
-                title_elem = match_box.find("h3", class_="cb-lv-scr-mtch-hdr")
-                score_elem = match_box.find("div", class_="cb-scr-wll-chvrn cb-lv-scrs-col")
-                status_elem = match_box.find("div", class_="cb-text-live") or match_box.find("div", class_="cb-text-complete")
-                
-                if title_elem:
-                    title_text = title_elem.text.strip()
-                    status_text = status_elem.text.lower().strip() if status_elem else "upcoming"
-                    
-                    # Deduplicate from RSS
-                    if not any(title_text[:10] in m["name"] for m in matches):
-                        status = "live" if "live" in status_text or "stumps" in status_text else ("completed" if "won" in status_text else "upcoming")
-                        score = score_elem.text.strip() if score_elem and status == "live" else None
-                        
-                        matches.append({
-                            "id": f"cb_{random.randint(1000,9999)}",
-                            "name": title_text,
-                            "status": status,
-                            "score": score,
-                            "rr": None,
-                            "time": "Today",
-                            "venue": "Unknown"
-                        })
+        return await asyncio.wait_for(coro, timeout=SOURCE_TIMEOUTS[name])
     except Exception as e:
-        print(f"Cricbuzz Scrape Error: {e}")
+        print(f"{name} fetch error: {e!r}")
+        return default
 
-    if matches:
-        return sorted(matches, key=lambda x: 0 if x["status"] == "live" else (1 if x["status"] == "upcoming" else 2))
-    return []
+async def aggregate_today_matches(client):
+    """Queries every upstream concurrently and merges them (CricAPI > RSS > Cricbuzz) by match id."""
+    api_matches, rss_matches, cb_matches = await asyncio.gather(
+        _guarded("cricapi", fetch_cricapi_async(client), None),
+        _guarded("rss", fetch_rss_async(client), []),
+        _guarded("cricbuzz", fetch_cricbuzz_async(client), [])
+    )
+    matches = merge_matches(api_matches, rss_matches, cb_matches)
+    match_store.update(matches)
+    return matches
 
 @app.get("/today-matches", response_model=List[Match])
-def get_today_matches():
-    # 1. API
-    matches = fetch_cricapi_matches()
-    if matches: return [Match(**m) for m in matches]
-    
-    # 2. Scraped/RSS
-    scraped = scrape_fallback_matches()
-    if scraped: return [Match(**m) for m in scraped]
+async def get_today_matches():
+    # Served from the shared cache; upstreams are hit at most once per TTL for all clients
+    client = app.state.http_client
+    matches = await match_cache.get("today", lambda: aggregate_today_matches(client))
     
     # No fake data -> Returning empty [] if none found
-    return []
+    return [Match(**m) for m in matches]
+
+@app.get("/win-probability")
+async def win_probability(balls_remaining: float, wickets_lost: int, runs_needed: float):
+    """Instant chase estimate from the precomputed table (no simulation)."""
+    table = getattr(app.state, "win_table", None)
+    if table is None:
+        raise HTTPException(status_code=503, detail="Win table not built (run src/win_table.py)")
+    win_prob, expected_runs = table.lookup(balls_remaining, wickets_lost, runs_needed)
+    return {"win_probability": round(win_prob, 2), "expected_runs": round(expected_runs, 2)}
+
+@app.get("/matches/{match_id}")
+async def get_match(match_id: str):
+    entry = match_store.get(match_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown match_id")
+    return {"match": Match(**entry["match"]), "version": entry["version"], "updated_at": entry["updated_at"]}
+
+@app.get("/match-stream")
+async def match_stream(request: Request):
+    """Server-Sent Events: a full snapshot on connect, then only changed/removed matches."""
+    async def frames():
+        async for frame in broadcaster.subscribe():
+            if await request.is_disconnected():
+                break
+            yield frame
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def team_win_prob(res, req):
+    """Win probability from the selected team's side: the simulated batting side wins the chase."""
+    if req.innings != 2 or req.target is None:
+        return None
+    return res["win_prob"] if req.role.lower() != "fielding" else 100 - res["win_prob"]
+
+def describe_tactic(name, res, baseline, req):
+    coach = "Fielding Coach" if req.role.lower() == "fielding" else "Batting Coach"
+    win_prob, base_win = team_win_prob(res, req), team_win_prob(baseline, req)
+    if win_prob is not None:
+        effect = f"{win_prob - base_win:+.1f}% win prob"
+    else:
+        effect = f"{res['expected_score'] - baseline['expected_score']:+.1f} runs projected"
+    return f"As {req.selected_team} {coach} → {name} → {effect}"
 
 @app.post("/live-prediction")
-def live_prediction(req: LivePredictionRequest):
-    base_prob = round(random.uniform(30.0, 70.0), 1)
+async def live_prediction(req: LivePredictionRequest):
+    batcher = getattr(app.state, "batcher", None)
+    if batcher is None:
+        raise HTTPException(status_code=503, detail="Prediction engine not loaded")
     
-    if req.role.lower() == "fielding":
-        tactics = [
-            f"As {req.selected_team} Fielding Coach → Review bowler matchups -> +{round(random.uniform(2, 6), 1)}% wicket chance",
-            f"As {req.selected_team} Fielding Coach → Suggest Yorkers to current batter → +{round(random.uniform(2, 6), 1)}% wicket chance",
-            f"As {req.selected_team} Fielding Coach → Move Long On inside circle to restrict singles → -{round(random.uniform(4, 8), 1)} runs projected",
-            f"As {req.selected_team} Fielding Coach → Deploy leg spinner for next over → +{round(random.uniform(3, 7), 1)}% win prob"
-        ]
-        focus = "bowling/fielding tactics"
-    else:
-        tactics = [
-            f"As {req.selected_team} Batting Coach → Consolidate next 3 overs to maintain wickets → Stable Required RR",
-            f"As {req.selected_team} Batting Coach → Increase aggregate risk level against pacers → +{round(random.uniform(5, 10), 1)}% win prob",
-            f"As {req.selected_team} Batting Coach → Target shorter boundary with sweep shots → +12 runs projected",
-            f"As {req.selected_team} Batting Coach → Adopt aggressive powerplay approach → +{round(random.uniform(4, 9), 1)}% win prob"
-        ]
-        focus = "chasing/batting strategy"
+    if not req.has_state():
+        entry = match_store.get(req.match_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Unknown match")
+        if entry["match"]["status"] != "upcoming":
+            state = parse_score_state(entry["match"].get("score"))
+            if state is None:
+                raise HTTPException(status_code=422, detail="The live feed has no overs for the current innings of this match, so its state is unknown. Try again once a detailed score is available.")
+            req = req.model_copy(update=state)
+    
+    fielding = req.role.lower() == "fielding"
+    focus = "bowling/fielding tactics" if fielding else "chasing/batting strategy"
+    if req.innings_complete():
+        # Terminal state: the result is known, there is nothing to simulate or suggest
+        chased = req.target is not None and req.current_score > req.target
+        win_prob = team_win_prob({"win_prob": 100.0 if chased else 0.0}, req)
+        return {
+            "match_id": req.match_id,
+            "team": req.selected_team,
+            "role": req.role,
+            "focus": focus,
+            "innings_complete": True,
+            "current_win_probability": win_prob,
+            "expected_score": float(req.current_score),
+            "suggested_tactics": []
+        }
+    
+    results = await batcher.submit(req.sim_state())
+    baseline = results["Baseline"]
+    
+    def benefit(item):
+        # Higher is better for the selected team: win prob if chasing, else runs (fewer when fielding)
+        name, res = item
+        win_prob = team_win_prob(res, req)
+        if win_prob is not None:
+            return win_prob
+        return -res["expected_score"] if fielding else res["expected_score"]
+    
+    options = TACTIC_ROLES["fielding" if fielding else "batting"]
+    ranked = sorted(((n, r) for n, r in results.items() if n in options), key=benefit, reverse=True)
+    win_prob = team_win_prob(baseline, req)
 
     return {
         "match_id": req.match_id,
         "team": req.selected_team,
         "role": req.role,
         "focus": focus,
-        "current_win_probability": base_prob,
-        "suggested_tactics": tactics[:3]
+        "innings_complete": False,
+        "current_win_probability": round(win_prob, 1) if win_prob is not None else None,
+        "expected_score": round(float(baseline["expected_score"]), 1),
+        "suggested_tactics": [describe_tactic(name, res, baseline, req) for name, res in ranked[:3]]
     }
 
 if __name__ == "__main__":
@@ -7,9 +7,11 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from src.data_loader import process_data, get_player_stats
+from src.data_loader import process_data, load_deliveries, latest_player_form, PLAYER_FORM_COLUMNS
+from src.stats_index import load_stats_index
 from src.models import NeuroPredictor, train_pipeline
-from src.simulator import MatchSimulator
+from src.simulator import MatchSimulator, TacticResultCache
+from src.win_table import load_win_table, build_and_save
 from src.field_opt import generate_field_suggestions, plot_field
 import time
 
@@ -46,13 +48,21 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Dashboard simulations: a quick estimate is shown at once and replaced by the converged
+# one when the background run finishes. The fixed seed makes results cacheable.
+QUICK_SIMS = 500
+FULL_SIMS = 5000
+SIM_SEED = 42
+REFRESH_SECONDS = 0.5
+
 # --- Init Data & Models ---
 @st.cache_resource
 def load_system():
     # 1. Load Data
     with st.spinner("Initializing NeuroPitch Engine... (Downloading Data if needed)"):
-        # Limited load for prototype speed
-        df = process_data(limit=100) 
+        # Ingests every raw match into the store (parallel on first run, incremental after);
+        # only the first 100 matches are returned for the dashboard frame
+        df = process_data(limit=100)
     
     # 2. Train/Load Model
     model = NeuroPredictor()
@@ -61,14 +71,27 @@ def load_system():
             train_pipeline()
             model.load_model()
             
-    # 3. Stats
-    batters, bowlers = get_player_stats(df)
+    # 3. Stats (persisted aggregate index, kept up to date by process_data)
+    stats = load_stats_index(df)
+    
+    # 4. Chase win-probability table (built once from the whole processed store)
+    win_table = load_win_table() or build_and_save()
+    
+    # 5. Recent form of every player (rolling window), fed to the model as match context.
+    # Read from the whole store: df only holds the first matches by file name, not the latest
+    player_form = latest_player_form(load_deliveries(columns=PLAYER_FORM_COLUMNS))
     
-    return df, model, batters, bowlers
+    return df, model, stats, win_table, player_form
+
+@st.cache_resource
+def load_result_cache():
+    """Simulation results shared by every session of this process (LRU + background refinement)."""
+    _, model, _, _, _ = load_system()
+    return TacticResultCache(MatchSimulator(model=model))
 
 try:
-    df, model_engine, batter_stats, bowler_stats = load_system()
-    simulator = MatchSimulator(model=model_engine)
+    df, model_engine, stats_index, win_table, player_form = load_system()
+    result_cache = load_result_cache()
 except Exception as e:
     st.error(f"System Backend Failed: {e}")
     st.stop()
@@ -97,8 +120,8 @@ if innings == 2:
 
 st.sidebar.subheader("Current Players")
 # Get top players from stats
-top_batters = batter_stats.sort_values('runs', ascending=False).head(50)['batter'].tolist()
-top_bowlers = bowler_stats.sort_values('wickets', ascending=False).head(50)['bowler'].tolist()
+top_batters = stats_index.top_batters(50)
+top_bowlers = stats_index.top_bowlers(50)
 
 striker = st.sidebar.selectbox("Striker", top_batters, index=0)
 bowler = st.sidebar.selectbox("Bowler", top_bowlers, index=0)
@@ -107,6 +130,10 @@ st.sidebar.subheader("Conditions")
 dew = st.sidebar.checkbox("Dew Factor (+Run Rate)")
 pitch = st.sidebar.select_slider("Pitch Type", options=["Green", "Flat", "Turning", "Dusty"], value="Flat")
 
+# Chases are answered instantly from the precomputed table; Monte Carlo only on request
+use_table = innings == 2 and win_table is not None
+refine = st.sidebar.checkbox("Matchup-specific simulation", value=not use_table, disabled=not use_table)
+
 # --- Tactical Logic ---
 st.title("NeuroPitch: Captain's Dashboard")
 
@@ -119,31 +146,58 @@ sim_state = {
     'target': target_runs if innings == 2 else 9999,
     'current_score': current_runs if innings == 2 else 0,
     'batter': striker,
-    'bowler': bowler
+    'bowler': bowler,
+    'player_form': player_form
 }
 
-# Run Baseline Sim
-baseline_res = simulator.simulate_innings(sim_state, n_sims=5000)
+tactics = {
+    "Baseline": None,
+    "Attack (Bring Fielders In)": {'intent': 'attack'},
+    "Defend (Spread Field)": {'intent': 'defend'},
+    "Bowl Wide Yorkers": {'bowler_type': 'yorker_specialist'}
+}
+
+refining = False
+if refine:
+    # Baseline + all tactics share one model call and random draws; results are cached
+    # process-wide, so reruns for unrelated widgets (and other sessions) reuse them
+    tactic_results = result_cache.get(sim_state, tactics, FULL_SIMS, SIM_SEED)
+    refining = len(tactic_results) < len(tactics)
+    if refining:
+        result_cache.refine(sim_state, tactics, FULL_SIMS, SIM_SEED)
+        tactic_results = result_cache.simulate(sim_state, tactics, QUICK_SIMS, SIM_SEED)
+    baseline_res = tactic_results["Baseline"]
+else:
+    tactic_results = {}
+    baseline_res = win_table.lookup_state(sim_state)
 
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Win Probability", f"{baseline_res['win_prob']:.1f}%", delta_color="normal")
 c2.metric("Expected Score", f"{int(baseline_res['expected_score'])}")
 c3.metric("Projected Runs", f"{int(baseline_res['expected_score'] - sim_state['current_score'])}")
-c4.metric("Risk Level", "High" if baseline_res['risk_std'] > 15 else "Low")
+if 'risk_std' in baseline_res:
+    c4.metric("Risk Level", "High" if baseline_res['risk_std'] > 15 else "Low")
+else:
+    c4.metric("Source", "League table")
+
+if refining:
+    st.caption(f"Quick estimate from {QUICK_SIMS:,} simulations - refining to {FULL_SIMS:,} in the background...")
+
+    @st.fragment(run_every=REFRESH_SECONDS)
+    def await_refinement():
+        # Full rerun once the converged results are cached
+        if len(result_cache.get(sim_state, tactics, FULL_SIMS, SIM_SEED)) == len(tactics):
+            st.rerun()
+
+    await_refinement()
 
 # --- Tactical Recommendations ---
 st.header("🧠 Tactical Recommendations")
-
-tactics = {
-    "Baseline": None,
-    "Attack (Bring Fielders In)": {'intent': 'attack'},
-    "Defend (Spread Field)": {'intent': 'defend'},
-    "Bowl Wide Yorkers": {'bowler_type': 'yorker_specialist'}
-}
+if not refine:
+    st.info("Enable 'Matchup-specific simulation' to compare tactics for this batter/bowler.")
 
 results = []
-for name, mod in tactics.items():
-    res = simulator.simulate_innings(sim_state, n_sims=2000, tactical_mods=mod)
+for name, res in tactic_results.items():
     try:
         win_delta = res['win_prob'] - baseline_res['win_prob']
     except:
@@ -155,7 +209,7 @@ for name, mod in tactics.items():
         "Exp Score": int(res['expected_score'])
     })
 
-res_df = pd.DataFrame(results)
+res_df = pd.DataFrame(results, columns=["Tactic", "Win %", "Delta", "Exp Score"])
 st.table(res_df.style.applymap(lambda x: 'color: green' if x > 0 else 'color: red', subset=['Delta']))
 
 # --- Field Visual ---
@@ -170,22 +224,35 @@ with col_f1:
 
 with col_f2:
     st.subheader("Batter Analysis")
-    b_stat = batter_stats[batter_stats['batter'] == striker]
-    if not b_stat.empty:
-        st.write(f"**Strike Rate:** {b_stat['strike_rate'].values[0]:.1f}")
-        st.write(f"**Avg:** {b_stat['avg'].values[0]:.1f}")
+    current_phase = 'Powerplay' if overs_done < 6 else ('Middle' if overs_done < 16 else 'Death')
+    b_stat = stats_index.batter(striker)
+    if b_stat:
+        st.write(f"**Strike Rate:** {b_stat['strike_rate']:.1f}")
+        st.write(f"**Avg:** {b_stat['avg']:.1f}")
+        b_phase = stats_index.batter_phase(striker, current_phase)
+        if b_phase:
+            st.write(f"**{current_phase} SR:** {b_phase['strike_rate']:.1f} ({b_phase['balls']} balls)")
         st.write("Weakness: Off-spin (Historical proxy)") # Placeholder
     
     st.subheader("Bowler Matchup")
-    bw_stat = bowler_stats[bowler_stats['bowler'] == bowler]
-    if not bw_stat.empty:
-        st.write(f"**Economy:** {bw_stat['economy'].values[0]:.1f}")
+    bw_stat = stats_index.bowler(bowler)
+    if bw_stat:
+        st.write(f"**Economy:** {bw_stat['economy']:.1f}")
+    h2h = stats_index.head_to_head(striker, bowler)
+    if h2h:
+        st.write(f"**Head-to-head:** {h2h['runs']} runs off {h2h['balls']} balls, {h2h['dismissals']} dismissals")
 
 # --- Outcome Distribution ---
 st.header("📊 Outcomes projection")
-fig_hist = px.histogram(baseline_res['sim_scores'], nbins=30, title="Projected Run Distribution (Monte Carlo)")
-st.plotly_chart(fig_hist, use_container_width=True)
+if 'sim_scores' in baseline_res:
+    fig_hist = px.histogram(baseline_res['sim_scores'], nbins=30, title="Projected Run Distribution (Monte Carlo)")
+    st.plotly_chart(fig_hist, use_container_width=True)
+else:
+    # The chase table gives win probability and expected runs, not a score distribution
+    st.caption(f"Source: precomputed league chase table - {baseline_res['win_prob']:.1f}% win probability, "
+               f"{baseline_res['expected_score']:.0f} expected final score. "
+               "Enable 'Matchup-specific simulation' for the simulated run distribution.")
 
 # --- Footer ---
 st.markdown("---")
-st.caption("NeuroPitch Prototype | v0.1 | Powered by XGBoost & Scikit-Learn")
+st.caption("NeuroPitch Prototype | v0.1 | Powered by Scikit-Learn (Random Forest / Histogram Gradient Boosting)")
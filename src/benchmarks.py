@@ -0,0 +1,171 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from src.simulator import MatchSimulator
+
+
+def _timeit(fn, repeat=3):
+    """Best wall-clock time of `repeat` runs, in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def bench_termination(sizes=(1_000, 10_000, 100_000), total_balls=24, seed=42):
+    """
+    Compares the per-sim loop against the vectorized end-of-innings detection.
+    Uses a death-overs chase (4 overs left, 3 down, 40 needed) so all three
+    termination paths (all out, target chased, overs done) are exercised.
+    """
+    sim = MatchSimulator(model=None)
+    probs = np.array([0.35, 0.3, 0.08, 0.01, 0.1, 0.06, 0.1])
+    run_map = np.array([0, 1, 2, 3, 4, 6, 0])
+    wicket_map = np.array([0, 0, 0, 0, 0, 0, 1])
+    target = 180
+
+    print(f"{'n_sims':>10} {'loop (ms)':>12} {'vector (ms)':>12} {'speedup':>9}")
+    for n_sims in sizes:
+        rng = np.random.default_rng(seed)
+        outcomes = rng.choice(len(probs), size=(n_sims, total_balls), p=probs)
+        cum_runs = run_map[outcomes].cumsum(axis=1) + 140
+        cum_wickets = wicket_map[outcomes].cumsum(axis=1) + 3
+
+        loop_scores, loop_won = sim._resolve_innings_loop(cum_runs, cum_wickets, target)
+        vec_scores, vec_won = sim._resolve_innings(cum_runs, cum_wickets, target)
+        assert loop_won == vec_won and np.array_equal(np.asarray(loop_scores), vec_scores)
+
+        t_loop = _timeit(lambda: sim._resolve_innings_loop(cum_runs, cum_wickets, target))
+        t_vec = _timeit(lambda: sim._resolve_innings(cum_runs, cum_wickets, target))
+        print(f"{n_sims:>10,} {t_loop:>12.1f} {t_vec:>12.2f} {t_loop / t_vec:>8.0f}x")
+
+
+class _StaticModel:
+    """Stands in for NeuroPredictor with a fixed outcome distribution, so engine benchmarks need no trained model."""
+    class _Outcomes:
+        classes_ = np.array([0, 1, 2, 3, 4, 6, 7])
+    outcome_model = _Outcomes()
+
+    def predict_probs(self, current_state):
+        return np.array([0.35, 0.3, 0.08, 0.01, 0.1, 0.06, 0.1])
+
+
+def bench_parallel(n_sims=1_000_000, workers=(1, 2, 4, 8, 16, 32), seed=42):
+    """Wall-clock scaling of simulate_innings_parallel over worker counts (full 20-over chase)."""
+    sim = MatchSimulator(model=_StaticModel())
+    state = {'overs_done': 0, 'balls_done': 0, 'wickets_lost': 0, 'target': 170,
+             'current_score': 0, 'batter': None, 'bowler': None}
+    workers = [w for w in workers if w <= (os.cpu_count() or 1)] or [1]
+
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>9} {'win %':>8}")
+    base = None
+    for n in workers:
+        t0 = time.perf_counter()
+        res = sim.simulate_innings_parallel(state, n_sims=n_sims, seed=seed, n_workers=n, return_scores=False)
+        elapsed = time.perf_counter() - t0
+        base = base or elapsed
+        print(f"{n:>8} {elapsed:>10.2f} {base / elapsed:>8.1f}x {res['win_prob']:>8.3f}")
+
+
+def _synthetic_deliveries(n_matches=300, n_batters=400, n_bowlers=250, seed=42):
+    """Deliveries-shaped frame with skewed player usage and player-dependent outcomes."""
+    rng = np.random.default_rng(seed)
+    n = n_matches * 2 * 120
+    over = np.tile(np.repeat(np.arange(20), 6), n_matches * 2)
+    batter = rng.zipf(1.4, n) % n_batters
+    bowler = rng.zipf(1.4, n) % n_bowlers
+    # Per-player skill shifts the dot / boundary / wicket mix
+    skill = rng.normal(0, 0.5, n_batters)[batter] - rng.normal(0, 0.3, n_bowlers)[bowler] + (over >= 16) * 0.4
+    base = np.log(np.array([0.35, 0.33, 0.09, 0.01, 0.11, 0.05, 0.06]))
+    logits = base + np.outer(skill, [-1, 0, 0, 0, 1, 1.2, -0.8])
+    probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    outcome = (probs.cumsum(axis=1) < rng.random((n, 1))).sum(axis=1)
+    return pd.DataFrame({
+        'innings': np.repeat(np.tile([1, 2], n_matches), 120),
+        'over': over,
+        'ball': np.tile(np.arange(1, 7), n_matches * 40),
+        'batter': pd.Series(batter).map('batter_{}'.format),
+        'bowler': pd.Series(bowler).map('bowler_{}'.format),
+        'phase': np.where(over <= 5, 'Powerplay', np.where(over <= 15, 'Middle', 'Death')),
+        'runs_batter': np.array([0, 1, 2, 3, 4, 6, 0])[outcome],
+        'is_wicket': (outcome == 6).astype(int)
+    })
+
+
+def _latency_ms(fn, rows):
+    """Per-call wall-clock latencies (ms) of fn on single-row inputs."""
+    fn(rows[:1])
+    out = np.empty(len(rows))
+    for i in range(len(rows)):
+        t0 = time.perf_counter()
+        fn(rows[i:i + 1])
+        out[i] = time.perf_counter() - t0
+    return out * 1000
+
+
+def bench_models(df=None, backends=('forest', 'hgb'), n_latency=500, batch_rows=10_000):
+    """
+    Outcome-model backends: artifact size, load time, single-row latency (p50/p99),
+    batch throughput and held-out log-loss, for sklearn's predict_proba and the
+    compiled inference path. Uses the processed store if present, else synthetic data.
+    """
+    import joblib
+    from sklearn.metrics import log_loss
+    from sklearn.model_selection import train_test_split
+    from src.models import NeuroPredictor, MODEL_BACKENDS, compile_model
+
+    if df is None:
+        from src.data_loader import load_deliveries
+        df = load_deliveries(columns=['innings', 'over', 'ball', 'legal_ball', 'batter', 'bowler', 'phase', 'runs_batter', 'is_wicket'])
+        if df.empty:
+            df = _synthetic_deliveries()
+            print(f"(no processed store - using {len(df):,} synthetic deliveries)")
+
+    predictor = NeuroPredictor()
+    X, y = predictor.prepare_data(df)
+    X_train, X_test, y_train, y_test = train_test_split(X.to_numpy(), y.to_numpy(), test_size=0.2, random_state=42)
+    rng = np.random.default_rng(0)
+    single_rows = X_test[rng.integers(0, len(X_test), n_latency)]
+    batch = X_test[rng.integers(0, len(X_test), batch_rows)]
+
+    print(f"{'backend':>8} {'path':>9} {'size (MB)':>10} {'load (ms)':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'rows/s':>10} {'log-loss':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            model = MODEL_BACKENDS[backend]().fit(X_train, y_train)
+            path = os.path.join(tmp, f"{backend}.joblib")
+            joblib.dump(model, path)
+            size_mb = os.path.getsize(path) / 1e6
+            load_ms = _timeit(lambda: joblib.load(path))
+            loss = log_loss(y_test, model.predict_proba(X_test), labels=model.classes_)
+
+            paths = {'sklearn': model.predict_proba}
+            compiled = compile_model(model, X_test[:512])
+            if compiled is not None:
+                paths['compiled'] = compiled.predict_proba
+            for name, predict in paths.items():
+                latency = _latency_ms(predict, single_rows)
+                throughput = batch_rows / (_timeit(lambda: predict(batch), repeat=2) / 1000)
+                print(f"{backend:>8} {name:>9} {size_mb:>10.2f} {load_ms:>10.1f} {np.percentile(latency, 50):>9.3f} "
+                      f"{np.percentile(latency, 99):>9.3f} {throughput:>10,.0f} {loss:>9.4f}")
+
+
+BENCHMARKS = {
+    'termination': bench_termination,
+    'parallel': bench_parallel,
+    'models': bench_models,
+}
+
+if __name__ == "__main__":
+    # Usage: python src/benchmarks.py [name ...]
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name]()
@@ -3,61 +3,186 @@ import io
 import requests
 import zipfile
 import json
+import hashlib
+import shutil
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError: # Optional: falls back to the pickle store
+    pa = ds = pq = None
 
 # Config
 DATA_DIR = Path("data")
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
 CRICSHEET_URL = "https://cricsheet.org/downloads/t20s_male_json.zip"
+RAW_INDEX_PATH = PROCESSED_DIR / "raw_index.json"
+ARCHIVE_PATH = DATA_DIR / "t20s_data.zip"
+DOWNLOAD_MARKER_PATH = DATA_DIR / "download_complete.json"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DELIVERIES_DIR = PROCESSED_DIR / "deliveries" # Parquet dataset, partitioned by season
+PICKLE_STORE_PATH = PROCESSED_DIR / "matches_flat.pkl"
+ARRAYS_DIR = PROCESSED_DIR / "arrays" # Memory-mappable .npy export + schema.json
+# process_data parses with a process pool (one worker per CPU) once this many matches changed
+PARALLEL_PARSE_MIN_FILES = 50
+
+# Storage dtypes for the processed store
+CATEGORICAL_COLUMNS = [
+    "match_id", "venue", "batting_team", "bowling_team", "batter", "bowler",
+    "non_striker", "wicket_type", "player_out"
+]
+NARROW_INT_COLUMNS = {
+    "innings": "int8", "over": "int8", "ball": "int8", "runs_batter": "int8",
+    "runs_extras": "int8", "runs_total": "int8", "extras_wides": "int8", "extras_noballs": "int8",
+    "extras_byes": "int8", "extras_legbyes": "int8", "is_wicket": "int8", "legal_ball": "int8",
+    "season": "int16"
+}
+# Bump when the processed schema changes; stores built with another version are rebuilt
+STORE_VERSION = 3
 
 def ensure_directories():
     os.makedirs(RAW_DIR, exist_ok=True)
     os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-def download_data():
-    """Downloads and extracting Cricsheet T20 JSON data."""
+def download_data(url=CRICSHEET_URL, extract=True, expected_sha256=None,
+                  chunk_size=DOWNLOAD_CHUNK_SIZE, retries=3):
+    """
+    Downloads and extracting Cricsheet T20 JSON data.
+    The download resumes from a partial .part file via HTTP Range requests, is verified
+    (optional sha256, zip CRCs) and only then recorded in an atomic completion marker.
+    extract=False keeps the verified zip in place for process_data(from_archive=True),
+    which parses members straight from the archive without loose JSON files.
+    """
     ensure_directories()
     
-    # Check if we already have data to avoid re-downloading large files in dev
-    if list(RAW_DIR.glob("*.json")):
-        print(f"Data already present in {RAW_DIR}. Skipping download.")
-        return
+    # Skip only when a previous run recorded a complete download/extraction
+    marker = read_download_marker()
+    if marker and download_marker_valid(marker, extract):
+        print(f"Data already present ({marker['members']} matches). Skipping download.")
+        return marker
 
-    print(f"Downloading data from {CRICSHEET_URL}...")
-    zip_path = DATA_DIR / "t20s_data.zip"
-    
+    print(f"Downloading data from {url}...")
     try:
-        with requests.get(CRICSHEET_URL, stream=True) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(zip_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192): 
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total_size:
-                        done = int(50 * downloaded / total_size)
-                        print(f"\rDownloading: [{'=' * done}{' ' * (50-done)}] {downloaded//(1024*1024)}MB / {total_size//(1024*1024)}MB", end='')
+        zip_path = fetch_archive(url, expected_sha256=expected_sha256, chunk_size=chunk_size, retries=retries)
+        sha256 = file_sha256(zip_path)
         
-        print("\nExtracting zip file... (this may take a minute)")
         with zipfile.ZipFile(zip_path, 'r') as z:
-            z.extractall(RAW_DIR)
-            
-        print("Download and extraction complete.")
-        # Cleanup zip to save space
-        try:
+            members = [i for i in z.infolist() if i.filename.endswith(".json")]
+            if extract:
+                print("Extracting zip file... (this may take a minute)")
+                for info in members:
+                    target = RAW_DIR / Path(info.filename).name
+                    tmp_target = target.with_suffix(".json.tmp")
+                    with z.open(info) as src, open(tmp_target, "wb") as dst:
+                        shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK_SIZE)
+                    os.replace(tmp_target, target)
+        
+        marker = {
+            "url": url, "sha256": sha256, "size": zip_path.stat().st_size,
+            "members": len(members), "extracted": extract
+        }
+        if extract:
+            # Cleanup zip to save space
             os.remove(zip_path)
-        except:
-            pass
+        write_download_marker(marker)
+        print("Download complete." if not extract else "Download and extraction complete.")
+        return marker
             
     except Exception as e:
         print(f"\nFailed to download data: {e}")
-        # Create dummy data for offline/fallback mode
-        create_dummy_data()
+        if not list(RAW_DIR.glob("*.json")) and not ARCHIVE_PATH.exists():
+            # Create dummy data for offline/fallback mode
+            create_dummy_data()
+        return None
+
+def fetch_archive(url=CRICSHEET_URL, expected_sha256=None, chunk_size=DOWNLOAD_CHUNK_SIZE, retries=3):
+    """
+    Streams the archive to ARCHIVE_PATH, resuming an interrupted download with a Range
+    request. Verifies sha256 (if given) and the zip's CRCs before the final rename.
+    """
+    part_path = ARCHIVE_PATH.with_name(ARCHIVE_PATH.name + ".part")
+    last_error = None
+    
+    for attempt in range(retries):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with requests.get(url, stream=True, headers=headers, timeout=30) as r:
+                if r.status_code == 416:
+                    # Nothing left to send: the partial file is already complete
+                    break
+                r.raise_for_status()
+                if offset and r.status_code != 206:
+                    offset = 0 # Server ignored the Range header; start over
+                total_size = offset + int(r.headers.get('content-length', 0))
+                downloaded = offset
+                
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        if total_size:
+                            done = int(50 * downloaded / total_size)
+                            print(f"\rDownloading: [{'=' * done}{' ' * (50-done)}] {downloaded//(1024*1024)}MB / {total_size//(1024*1024)}MB", end='')
+            print()
+            if total_size and part_path.stat().st_size < total_size:
+                last_error = IOError(f"Connection closed at {part_path.stat().st_size} of {total_size} bytes")
+                continue
+            break
+        except requests.RequestException as e:
+            last_error = e
+            print(f"\nDownload attempt {attempt + 1} failed: {e}")
+    else:
+        raise last_error
+    
+    if expected_sha256 and file_sha256(part_path) != expected_sha256.lower():
+        part_path.unlink()
+        raise ValueError("Checksum mismatch for downloaded archive")
+    with zipfile.ZipFile(part_path) as z:
+        bad_member = z.testzip()
+    if bad_member:
+        part_path.unlink()
+        raise ValueError(f"Corrupt archive member: {bad_member}")
+    
+    os.replace(part_path, ARCHIVE_PATH)
+    return ARCHIVE_PATH
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def read_download_marker():
+    if DOWNLOAD_MARKER_PATH.exists():
+        with open(DOWNLOAD_MARKER_PATH) as f:
+            return json.load(f)
+    return None
+
+def write_download_marker(marker):
+    tmp_path = DOWNLOAD_MARKER_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(marker, f)
+    os.replace(tmp_path, DOWNLOAD_MARKER_PATH)
+
+def download_marker_valid(marker, extract=True):
+    """
+    Checks the recorded download still matches what is on disk for this mode.
+    An extracted download (zip removed) only serves extract=True; extract=False needs the zip.
+    """
+    archive_ok = ARCHIVE_PATH.exists() and ARCHIVE_PATH.stat().st_size == marker["size"]
+    if marker.get("extracted"):
+        return len(list(RAW_DIR.glob("*.json"))) >= marker["members"] and (extract or archive_ok)
+    if extract:
+        return False
+    return archive_ok
 
 def create_dummy_data():
     """Creates a small dummy dataset structure if download fails."""
@@ -91,12 +216,88 @@ def create_dummy_data():
     with open(RAW_DIR / "dummy_sample.json", "w") as f:
         json.dump(dummy_match, f)
 
-def parse_json_to_df(limit=None):
+# Column order of the flat deliveries table
+DELIVERY_COLUMNS = [
+    "match_id", "date", "venue", "batting_team", "bowling_team", "innings", "over", "ball",
+    "batter", "bowler", "non_striker", "runs_batter", "runs_extras", "runs_total",
+    "extras_wides", "extras_noballs", "extras_byes", "extras_legbyes",
+    "is_wicket", "wicket_type", "player_out"
+]
+
+def parse_match_file(file_path):
+    """
+    Parses one Cricsheet match JSON into a columnar chunk: {column: list}.
+    Raises on malformed files; callers decide how to report that.
+    """
+    file_path = Path(file_path)
+    with open(file_path, "r") as f:
+        data = json.load(f)
+    
+    return parse_match_data(data, file_path.stem)
+
+def parse_match_data(data, match_id):
+    """Columnar chunk for an already-loaded match JSON document."""
+    chunk = {col: [] for col in DELIVERY_COLUMNS}
+    
+    info = data.get("info", {})
+    venue = info.get("venue", "Unknown")
+    dates = info.get("dates", ["Unknown"])[0]
+    teams = info.get("teams", ["Team A", "Team B"])
+    
+    # Simple assumption: 1st innings only for simplicity or handle both
+    for inning_idx, inning in enumerate(data.get("innings", [])):
+        batting_team = inning.get("team")
+        bowling_team = [t for t in teams if t != batting_team][0] if len(teams) > 1 else "Unknown"
+        
+        for over_data in inning.get("overs", []):
+            over_num = over_data.get("over")
+            
+            for ball_idx, delivery in enumerate(over_data.get("deliveries", [])):
+                runs = delivery.get("runs", {})
+                extras = delivery.get("extras", {})
+                wicket = delivery.get("wicket", {})
+                
+                chunk["match_id"].append(match_id)
+                chunk["date"].append(dates)
+                chunk["venue"].append(venue)
+                chunk["batting_team"].append(batting_team)
+                chunk["bowling_team"].append(bowling_team)
+                chunk["innings"].append(inning_idx + 1)
+                chunk["over"].append(over_num)
+                chunk["ball"].append(ball_idx + 1)
+                chunk["batter"].append(delivery.get("batter"))
+                chunk["bowler"].append(delivery.get("bowler"))
+                chunk["non_striker"].append(delivery.get("non_striker"))
+                chunk["runs_batter"].append(runs.get("batter", 0))
+                chunk["runs_extras"].append(runs.get("extras", 0))
+                chunk["runs_total"].append(runs.get("total", 0))
+                chunk["extras_wides"].append(extras.get("wides", 0))
+                chunk["extras_noballs"].append(extras.get("noballs", 0))
+                chunk["extras_byes"].append(extras.get("byes", 0))
+                chunk["extras_legbyes"].append(extras.get("legbyes", 0))
+                chunk["is_wicket"].append(1 if wicket else 0)
+                chunk["wicket_type"].append(wicket.get("kind", ""))
+                chunk["player_out"].append(wicket.get("player_out", ""))
+    
+    return chunk
+
+def _parse_match_safe(file_path):
+    """Worker wrapper: (chunk, None) on success, (None, error message) on failure."""
+    try:
+        return parse_match_file(file_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def parse_json_to_df(limit=None, workers=None, files=None):
     """
     Parses JSON files into a flat Pandas DataFrame.
     limit: max number of matches to process (for speed).
+    workers: processes to parse with (None/1 = serial).
+    files: explicit list of match files (defaults to everything in RAW_DIR).
+    Files that fail to parse are listed in PROCESSED_DIR/parse_manifest.json and
+    in df.attrs['parse_failures'].
     """
-    json_files = list(RAW_DIR.glob("*.json"))
+    json_files = sorted(RAW_DIR.glob("*.json")) if files is None else [Path(f) for f in files]
     if not json_files:
         print("No JSON files found.")
         return pd.DataFrame()
@@ -104,109 +305,697 @@ def parse_json_to_df(limit=None):
     if limit:
         json_files = json_files[:limit]
         
-    all_deliveries = []
-    
     print(f"Parsing {len(json_files)} matches...")
+    if workers and workers > 1 and len(json_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(json_files) // (workers * 8))
+            results = list(pool.map(_parse_match_safe, json_files, chunksize=chunksize))
+    else:
+        results = [_parse_match_safe(f) for f in json_files]
+    
+    return _chunks_to_df([f.name for f in json_files], results)
+
+def _chunks_to_df(names, results):
+    """Concatenates per-match (chunk, error) results once and records the failures."""
+    chunks = [chunk for chunk, _ in results if chunk is not None]
+    failures = [{"file": name, "error": err} for name, (_, err) in zip(names, results) if err]
+    write_parse_manifest(len(names), failures)
+    
+    # Concatenate the per-file chunks once, column by column
+    df = pd.DataFrame({col: [v for chunk in chunks for v in chunk[col]] for col in DELIVERY_COLUMNS})
+    if df.empty:
+        df = pd.DataFrame()
+    df.attrs["parse_failures"] = failures
+    return df
+
+def archive_members(zip_path=ARCHIVE_PATH):
+    """Match JSON members of the archive, sorted by name."""
+    with zipfile.ZipFile(zip_path) as z:
+        return sorted((i for i in z.infolist() if i.filename.endswith(".json")), key=lambda i: i.filename)
+
+def _parse_archive_batch(zip_path, names):
+    """Worker: parses a batch of archive members straight from the zip (no loose files)."""
+    results = []
+    with zipfile.ZipFile(zip_path) as z:
+        for name in names:
+            try:
+                with z.open(name) as f:
+                    results.append((parse_match_data(json.load(f), Path(name).stem), None))
+            except Exception as e:
+                results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+def parse_zip_to_df(zip_path=ARCHIVE_PATH, members=None, limit=None, workers=None):
+    """
+    Parses match JSON members directly from the Cricsheet zip into a flat DataFrame,
+    streaming each member through the parser without extracting it to disk.
+    members: member names to parse (defaults to every .json member).
+    """
+    names = [i.filename for i in archive_members(zip_path)] if members is None else list(members)
+    if limit:
+        names = names[:limit]
+    if not names:
+        print("No JSON members found.")
+        return pd.DataFrame()
+    
+    print(f"Parsing {len(names)} matches from {Path(zip_path).name}...")
+    if workers and workers > 1 and len(names) > 1:
+        # Each worker opens the archive once per batch of members
+        n_batches = min(len(names), workers * 4)
+        batches = [names[i::n_batches] for i in range(n_batches)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batch_results = list(pool.map(_parse_archive_batch, [zip_path] * n_batches, batches))
+        by_name = {name: res for batch, results in zip(batches, batch_results) for name, res in zip(batch, results)}
+        results = [by_name[name] for name in names]
+    else:
+        results = _parse_archive_batch(zip_path, names)
+    
+    df = _chunks_to_df([Path(n).name for n in names], results)
+    return df
+
+def write_parse_manifest(n_files, failures):
+    """Records per-file parse failures so bad matches are visible instead of silently dropped."""
+    ensure_directories()
+    manifest = {"files": n_files, "parsed": n_files - len(failures), "failed": failures}
+    with open(PROCESSED_DIR / "parse_manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    if failures:
+        print(f"{len(failures)} of {n_files} matches failed to parse; see {PROCESSED_DIR / 'parse_manifest.json'}")
+
+def file_fingerprint(file_path, with_hash=True):
+    """Change-detection record for a raw file: mtime, size and (optionally) sha1 of its contents."""
+    stat = os.stat(file_path)
+    fp = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    if with_hash:
+        h = hashlib.sha1()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        fp["sha1"] = h.hexdigest()
+    return fp
+
+def load_raw_index():
+    """
+    {file name: fingerprint} of the raw files the processed store was built from.
+    Empty when missing or written for a different STORE_VERSION.
+    """
+    if RAW_INDEX_PATH.exists():
+        with open(RAW_INDEX_PATH) as f:
+            data = json.load(f)
+        if data.get("version") == STORE_VERSION:
+            return data["files"]
+    return {}
+
+def save_raw_index(index):
+    tmp_path = RAW_INDEX_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"version": STORE_VERSION, "files": index}, f)
+    os.replace(tmp_path, RAW_INDEX_PATH)
+
+def diff_raw_files(json_files, index):
+    """
+    Compares raw files against the index. Files are only hashed when mtime/size moved.
+    Returns (changed files, removed file names, refreshed index for the unchanged files).
+    """
+    changed, unchanged = [], {}
     for file_path in json_files:
-        try:
-            with open(file_path, "r") as f:
-                data = json.load(f)
-            
-            info = data.get("info", {})
-            venue = info.get("venue", "Unknown")
-            dates = info.get("dates", ["Unknown"])[0]
-            teams = info.get("teams", ["Team A", "Team B"])
-            
-            # Simple assumption: 1st innings only for simplicity or handle both
-            for inning_idx, inning in enumerate(data.get("innings", [])):
-                batting_team = inning.get("team")
-                bowling_team = [t for t in teams if t != batting_team][0] if len(teams) > 1 else "Unknown"
-                
-                for over_data in inning.get("overs", []):
-                    over_num = over_data.get("over")
-                    
-                    for ball_idx, delivery in enumerate(over_data.get("deliveries", [])):
-                        runs = delivery.get("runs", {})
-                        wicket = delivery.get("wicket", {})
-                        
-                        row = {
-                            "match_id": file_path.stem,
-                            "date": dates,
-                            "venue": venue,
-                            "batting_team": batting_team,
-                            "bowling_team": bowling_team,
-                            "innings": inning_idx + 1,
-                            "over": over_num,
-                            "ball": ball_idx + 1,
-                            "batter": delivery.get("batter"),
-                            "bowler": delivery.get("bowler"),
-                            "non_striker": delivery.get("non_striker"),
-                            "runs_batter": runs.get("batter", 0),
-                            "runs_extras": runs.get("extras", 0),
-                            "runs_total": runs.get("total", 0),
-                            "is_wicket": 1 if wicket else 0,
-                            "wicket_type": wicket.get("kind", ""),
-                            "player_out": wicket.get("player_out", "")
-                        }
-                        all_deliveries.append(row)
-        except Exception as e:
-            # print(f"Error parsing {file_path}: {e}")
+        known = index.get(file_path.name)
+        fp = file_fingerprint(file_path, with_hash=False)
+        if known and known.get("mtime_ns") == fp["mtime_ns"] and known.get("size") == fp["size"]:
+            unchanged[file_path.name] = known
             continue
+        fp = file_fingerprint(file_path)
+        if known and known.get("sha1") == fp["sha1"]:
+            # Touched but identical content
+            unchanged[file_path.name] = dict(known, **fp)
+        else:
+            changed.append(file_path)
+    
+    selected = {f.name for f in json_files}
+    removed = [name for name in index if name not in selected]
+    return changed, removed, unchanged
+
+def diff_archive_members(infos, index):
+    """
+    Like diff_raw_files for zip members, using the CRC32 and size from the zip directory.
+    Returns (changed member names, removed file names, index for the unchanged members).
+    """
+    changed, unchanged = [], {}
+    for info in infos:
+        name = Path(info.filename).name
+        known = index.get(name)
+        if known and known.get("crc") == info.CRC and known.get("size") == info.file_size:
+            unchanged[name] = known
+        else:
+            changed.append(info.filename)
+    
+    selected = {Path(i.filename).name for i in infos}
+    removed = [name for name in index if name not in selected]
+    return changed, removed, unchanged
 
-    df = pd.DataFrame(all_deliveries)
+def add_derived_columns(df):
+    """Feature engineering applied to freshly parsed deliveries."""
+    # Phase
+    df['phase'] = pd.cut(df['over'], bins=[-1, 5, 15, 20], labels=['Powerplay', 'Middle', 'Death'])
+    
+    # Legal-ball index within the over: the legal ball each delivery belongs to (1..6).
+    # Wides/no-balls share the number of the legal ball that follows them.
+    legal = legal_delivery_mask(df).astype(np.int16)
+    over_key = [df['match_id'], df['innings'], df['over']]
+    df['legal_ball'] = (legal.groupby(over_key, sort=False, observed=True).cumsum() - legal + 1).clip(upper=6)
+    
+    # Cumulative stats (simple version)
+    # Ideally should be historical, but for prototype we just use global stats
     return df
 
-def process_data(limit=500):
-    """Main pipeline to load and process data."""
+def add_context_features(df):
+    """
+    Point-in-time match context for every delivery (models.CONTEXT_COLUMNS), in one
+    vectorized pass over the whole store; every value describes the state *before* the ball:
+      innings_runs / innings_wickets: running totals within the innings (groupby-cumsum)
+      required_rate: runs per over still needed in a 2nd-innings chase (0 otherwise)
+      venue_run_rate: runs per legal ball at the venue in earlier matches
+      batter_form / bowler_form: runs per ball over the player's previous FORM_WINDOW deliveries
+    Rates are shrunk towards the league rate (models.shrunk_rate). Matches are ordered by
+    date for the cross-match features and deliveries keep their order within a match, so no
+    value depends on a later delivery. Adds the columns to df in place and returns it.
+    """
+    from src.models import FORM_WINDOW, shrunk_rate, required_run_rate
+    n = len(df)
+    flags = delivery_flags(df)
+    runs_total = np.asarray(df['runs_total']).astype(np.int64)
+    runs_batter = np.asarray(df['runs_batter']).astype(np.int64)
+    is_wicket = np.asarray(df['is_wicket']).astype(np.int64)
+    legal = flags['legal'].astype(np.int64)
+    innings = np.asarray(df['innings']).astype(np.int64)
+    match_code, _ = pd.factorize(np.asarray(df['match_id']))
+    
+    # Within-innings running state
+    innings_key = match_code * 16 + innings
+    def before(values):
+        return pd.Series(values).groupby(innings_key, sort=False).cumsum().to_numpy() - values
+    innings_runs = before(runs_total)
+    innings_balls = before(legal)
+    df['innings_runs'] = innings_runs.astype(np.int16)
+    df['innings_wickets'] = before(is_wicket).astype(np.int8)
+    
+    # Chase target = first-innings total + 1
+    n_matches = match_code.max() + 1
+    first_total = np.bincount(match_code, weights=runs_total * (innings == 1), minlength=n_matches)
+    runs_needed = np.where(innings == 2, first_total[match_code] + 1 - innings_runs, 0)
+    df['required_rate'] = required_run_rate(runs_needed, innings_balls).astype(np.float32)
+    
+    # Chronological row order: matches by date (unknown dates first), deliveries in stored order
+    dates = pd.to_datetime(pd.Series(np.asarray(df['date'])), errors='coerce')
+    match_date = dates.groupby(match_code).min().fillna(pd.Timestamp.min).to_numpy()
+    match_order = np.argsort(match_date, kind='stable')
+    match_rank = np.empty(n_matches, dtype=np.int64)
+    match_rank[match_order] = np.arange(n_matches)
+    order = np.argsort(match_rank[match_code], kind='stable')
+    
+    # Venue scoring rate over earlier matches only
+    match_venue = np.zeros(n_matches, dtype=np.int64)
+    match_venue[match_code] = pd.factorize(np.asarray(df['venue']))[0]
+    per_match = pd.DataFrame({
+        'venue': match_venue,
+        'runs': np.bincount(match_code, weights=runs_total, minlength=n_matches),
+        'balls': np.bincount(match_code, weights=legal, minlength=n_matches)
+    }).iloc[match_order]
+    prior = per_match.groupby('venue', sort=False)[['runs', 'balls']].cumsum() - per_match[['runs', 'balls']]
+    venue_rate = shrunk_rate(prior['runs'], prior['balls']).sort_index().to_numpy()
+    df['venue_run_rate'] = venue_rate[match_code].astype(np.float32)
+    
+    # Rolling player form: sums over each player's previous FORM_WINDOW deliveries
+    def form(player, runs, balls):
+        keys = pd.factorize(np.asarray(player)[order])[0]
+        window = {}
+        for name, values in (('runs', runs[order]), ('balls', balls[order])):
+            cum = pd.Series(values).groupby(keys, sort=False).cumsum() - values
+            window[name] = (cum - cum.groupby(keys, sort=False).shift(FORM_WINDOW).fillna(0)).to_numpy()
+        rate = np.empty(n, dtype=np.float32)
+        rate[order] = shrunk_rate(window['runs'], window['balls'])
+        return rate
+    df['batter_form'] = form(df['batter'], runs_batter, flags['faced'].astype(np.int64))
+    df['bowler_form'] = form(df['bowler'], flags['bowler_runs'], legal)
+    return df
+
+# Columns latest_player_form reads (for a projected load_deliveries over the whole store)
+PLAYER_FORM_COLUMNS = ['date', 'batter', 'bowler', 'runs_batter', 'runs_total',
+                       'extras_wides', 'extras_noballs', 'extras_byes', 'extras_legbyes']
+
+def latest_player_form(df):
+    """
+    Current form of every player after the last delivery in df, in the units of
+    batter_form / bowler_form: {'batter': {name: rate}, 'bowler': {name: rate}}.
+    Pass the whole store (load_deliveries(columns=PLAYER_FORM_COLUMNS)), not a subset.
+    Seeds simulator states (start_state['player_form']) for live matches.
+    """
+    from src.models import FORM_WINDOW, shrunk_rate
+    if df is None or len(df) == 0:
+        return {'batter': {}, 'bowler': {}}
+    flags = delivery_flags(df)
+    dates = pd.to_datetime(pd.Series(np.asarray(df['date'])), errors='coerce')
+    frame = pd.DataFrame({
+        'date': dates.to_numpy(),
+        'batter': np.asarray(df['batter']).astype(str),
+        'bowler': np.asarray(df['bowler']).astype(str),
+        'runs_batter': np.asarray(df['runs_batter']).astype(np.int64),
+        'faced': flags['faced'].astype(np.int64),
+        'bowler_runs': flags['bowler_runs'],
+        'legal': flags['legal'].astype(np.int64)
+    }).sort_values('date', kind='stable', na_position='first')
+    out = {}
+    for role, runs, balls in (('batter', 'runs_batter', 'faced'), ('bowler', 'bowler_runs', 'legal')):
+        recent = frame.groupby(role, sort=False).tail(FORM_WINDOW).groupby(role)[[runs, balls]].sum()
+        out[role] = dict(zip(recent.index, shrunk_rate(recent[runs], recent[balls]).tolist()))
+    return out
+
+def compact_deliveries(df):
+    """
+    Applies storage dtypes in place: dictionary-encoded categoricals for names, narrow
+    integers for counts, datetime dates and an int16 `season` (0 when the date is unknown).
+    """
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df['season'] = df['date'].dt.year.fillna(0)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col, dtype in NARROW_INT_COLUMNS.items():
+        if col in df.columns:
+            df[col] = df[col].fillna(0).astype(dtype)
+    return df
+
+def clear_processed_store():
+    """Deletes every derived artefact of the processed store (deliveries, index, aggregates)."""
+    from src.stats_index import STATS_INDEX_PATH
+    if DELIVERIES_DIR.exists():
+        shutil.rmtree(DELIVERIES_DIR)
+    for path in (PICKLE_STORE_PATH, RAW_INDEX_PATH, STATS_INDEX_PATH):
+        if path.exists():
+            path.unlink()
+
+def has_columnar_store():
+    return pq is not None and DELIVERIES_DIR.exists() and any(DELIVERIES_DIR.rglob("*.parquet"))
+
+def write_deliveries_store(df, seasons=None):
+    """
+    Writes deliveries as Parquet partitioned by season (hive layout: season=YYYY/).
+    seasons: only rewrite these partitions (default: all seasons present in df).
+    Falls back to a single pickle when pyarrow is unavailable.
+    """
+    if pq is None:
+        df.to_pickle(PICKLE_STORE_PATH)
+        return PICKLE_STORE_PATH
+    
+    seasons = set(df['season'].unique()) if seasons is None else set(seasons)
+    for season in seasons:
+        part = DELIVERIES_DIR / f"season={season}"
+        rows = df[df['season'] == season]
+        if part.exists():
+            for f in part.glob("*.parquet"):
+                f.unlink()
+        if rows.empty:
+            continue
+        part.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(rows.drop(columns=['season']), preserve_index=False)
+        pq.write_table(table, part / "part-0.parquet", compression="zstd")
+    return DELIVERIES_DIR
+
+def load_deliveries(columns=None, venue=None, date_from=None, date_to=None, seasons=None):
+    """
+    Loads processed deliveries with column projection and predicate pushdown.
+    columns: subset of columns to read (None = all).
+    venue: one venue name or a list of venues.
+    date_from / date_to: inclusive date bounds (anything pd.Timestamp accepts).
+    seasons: list of seasons; only those partitions are opened.
+    """
+    if pq is None or not has_columnar_store():
+        df = pd.read_pickle(PICKLE_STORE_PATH) if PICKLE_STORE_PATH.exists() else pd.DataFrame()
+        if df.empty:
+            return df
+        mask = pd.Series(True, index=df.index)
+        if venue is not None:
+            mask &= df['venue'].isin([venue] if isinstance(venue, str) else venue)
+        if date_from is not None:
+            mask &= df['date'] >= pd.Timestamp(date_from)
+        if date_to is not None:
+            mask &= df['date'] <= pd.Timestamp(date_to)
+        if seasons is not None:
+            mask &= df['season'].isin(seasons)
+        df = df[mask]
+        return df[columns] if columns is not None else df
+    
+    dataset = ds.dataset(DELIVERIES_DIR, format="parquet", partitioning="hive")
+    expr = None
+    def _and(cond):
+        return cond if expr is None else expr & cond
+    if venue is not None:
+        expr = _and(ds.field('venue').isin([venue] if isinstance(venue, str) else list(venue)))
+    if date_from is not None:
+        expr = _and(ds.field('date') >= pa.scalar(pd.Timestamp(date_from), type=pa.timestamp('ns')))
+    if date_to is not None:
+        expr = _and(ds.field('date') <= pa.scalar(pd.Timestamp(date_to), type=pa.timestamp('ns')))
+    if seasons is not None:
+        expr = _and(ds.field('season').isin([int(x) for x in seasons]))
+    
+    table = dataset.to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    if 'season' in df.columns:
+        df['season'] = df['season'].astype(NARROW_INT_COLUMNS['season'])
+    return df
+
+def iter_delivery_batches(columns=None, batch_rows=250_000):
+    """
+    Yields processed deliveries as DataFrames of at most batch_rows rows.
+    The Parquet store is read one record batch at a time, so peak memory is about
+    one batch regardless of store size; the pickle fallback is loaded once and sliced.
+    """
+    if pq is None or not has_columnar_store():
+        df = load_deliveries(columns=columns)
+        for start in range(0, len(df), batch_rows):
+            yield df.iloc[start:start + batch_rows]
+        return
+    
+    dataset = ds.dataset(DELIVERIES_DIR, format="parquet", partitioning="hive")
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+def process_data(limit=500, workers=None, export_arrays=False, from_archive=False):
+    """
+    Main pipeline to load and process data.
+    The processed store is updated incrementally: raw files are fingerprinted in
+    data/processed/raw_index.json, and only new or changed matches are parsed; rows of
+    removed files are dropped. The store always covers every raw match, so the first run
+    (or a rebuild) parses the whole archive; later runs only touch what changed.
+    limit: only the first `limit` matches (in source order) are returned; the store itself
+    is not limited, so callers with different limits share one up-to-date store.
+    Deliveries are stored as season-partitioned Parquet (see load_deliveries for
+    filtered reads), or as a pickle when pyarrow is not installed.
+    workers: parse matches across this many processes (1 = serial; None = os.cpu_count()
+    when at least PARALLEL_PARSE_MIN_FILES matches changed, else serial).
+    export_arrays: also (re)write the memory-mapped .npy export in data/processed/arrays
+    whenever the store changes (or if it is missing).
+    from_archive: read matches straight from the downloaded zip instead of loose JSON
+    files in data/raw (members are fingerprinted by their zip CRC32/size).
+    """
     # 1. Download if needed
-    download_data()
+    download_data(extract=not from_archive)
+    
+    if from_archive:
+        sources = archive_members() if ARCHIVE_PATH.exists() else []
+    else:
+        sources = sorted(RAW_DIR.glob("*.json"))
+    from src.stats_index import StatsIndex, STATS_INDEX_PATH
     
     # 2. Check cache
-    cache_path = PROCESSED_DIR / "matches_flat.pkl"
-    if cache_path.exists():
+    index = load_raw_index()
+    store_exists = bool(index) and (has_columnar_store() or (pq is None and PICKLE_STORE_PATH.exists()))
+    if not store_exists:
+        # No store yet, one built for an older STORE_VERSION, or deliveries deleted under
+        # an existing index: forget the index and rebuild from scratch
+        clear_processed_store()
+        index = {}
+    df = load_deliveries() if store_exists else pd.DataFrame()
+    
+    if from_archive:
+        changed, removed, new_index = diff_archive_members(sources, index)
+    else:
+        changed, removed, new_index = diff_raw_files(sources, index)
+    
+    if not changed and not removed and store_exists:
         print("Loading cached processed data...")
-        return pd.read_pickle(cache_path)
+        if export_arrays and not (ARRAYS_DIR / "schema.json").exists():
+            export_delivery_arrays(df)
+        if not STATS_INDEX_PATH.exists() and not df.empty:
+            StatsIndex.from_deliveries(df).save()
+        return _first_matches(df, sources, limit)
+    
+    # 3. Drop stale matches, then parse new/changed ones
+    stale_ids = {Path(name).stem for name in removed} | {Path(f).stem for f in changed}
+    touched_seasons = set()
+    stale_rows = None
+    if not df.empty and stale_ids:
+        stale = df['match_id'].isin(stale_ids)
+        touched_seasons |= set(df.loc[stale, 'season'].unique())
+        stale_rows = df[stale]
+        df = df[~stale]
+    
+    if changed:
+        print(f"Parsing {len(changed)} new or changed matches...")
+        if workers is None:
+            workers = os.cpu_count() if len(changed) >= PARALLEL_PARSE_MIN_FILES else 1
+        if from_archive:
+            new_df = parse_zip_to_df(members=changed, workers=workers)
+            member_fps = {Path(i.filename).name: {"crc": i.CRC, "size": i.file_size} for i in sources}
+        else:
+            new_df = parse_json_to_df(workers=workers, files=changed)
+        failed = {f["file"] for f in new_df.attrs.get("parse_failures", [])}
+        for source in changed:
+            name = Path(source).name
+            fp = member_fps[name] if from_archive else file_fingerprint(source)
+            if name in failed:
+                # Remember broken files too, so they are only retried once they change
+                fp["failed"] = True
+            new_index[name] = fp
         
-    # 3. Parse and Create DF
-    print("Parsing raw data...")
-    df = parse_json_to_df(limit=limit)
+        # 4. Feature Engineering
+        new_df = new_df if not new_df.empty else None
+        if new_df is not None:
+            print("Engineering features...")
+            new_df = compact_deliveries(add_derived_columns(new_df))
+            touched_seasons |= set(new_df['season'].unique())
+            df = pd.concat([df, new_df], ignore_index=True) if not df.empty else new_df
     
     if df.empty:
         print("No data found or parsed.")
         return df
+    
+    # Concatenating categoricals with different categories falls back to object dtype
+    df = compact_deliveries(df.reset_index(drop=True))
+    df.attrs = {}
+    
+    # Context features look back across matches (venue rate, player form), so they are
+    # recomputed over the whole store, and later seasons than any touched one are rewritten too
+    df = add_context_features(df)
+    if touched_seasons:
+        touched_seasons |= {s for s in df['season'].unique() if s >= min(touched_seasons)}
+    
+    # Save (only the season partitions that changed)
+    store_path = write_deliveries_store(df, seasons=touched_seasons if store_exists else None)
+    save_raw_index(new_index)
+    
+    # Player/matchup aggregates follow the store incrementally
+    if store_exists and STATS_INDEX_PATH.exists():
+        stats_index = StatsIndex.load()
+        stats_index.update(added=new_df if changed else None, removed=stale_rows)
+    else:
+        stats_index = StatsIndex.from_deliveries(df)
+    stats_index.save()
+    
+    if export_arrays:
+        export_delivery_arrays(df)
+    print(f"Data processed and saved to {store_path} (+{len(changed)} changed, -{len(removed)} removed)")
+    return _first_matches(df, sources, limit)
+
+def _first_matches(df, sources, limit):
+    """Deliveries of the first `limit` source matches (all of df when limit is falsy)."""
+    if not limit or df.empty:
+        return df
+    keep = [Path(getattr(source, "filename", source)).stem for source in sources[:limit]]
+    return df[df['match_id'].isin(keep)].reset_index(drop=True)
+
+class DeliveryArrays:
+    """
+    Read-only, memory-mapped view of an exported deliveries table (see export_delivery_arrays).
+    Numeric columns are np.memmap-backed arrays; categorical columns are int32 code arrays
+    plus their categories. Every process that opens the same export shares one page-cache
+    copy. Indexing a categorical column returns a pd.Categorical over the mapped codes.
+    """
+    def __init__(self, path=ARRAYS_DIR):
+        self.path = Path(path)
+        with open(self.path / "schema.json") as f:
+            self.schema = json.load(f)
+        self.n_rows = self.schema["n_rows"]
+        self.arrays = {
+            col: np.load(self.path / spec["file"], mmap_mode="r")
+            for col, spec in self.schema["columns"].items()
+        }
+
+    @property
+    def columns(self):
+        return list(self.arrays)
+
+    @property
+    def index(self):
+        return pd.RangeIndex(self.n_rows)
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, col):
+        return col in self.arrays
+
+    def codes(self, col):
+        """Raw int32 codes of a categorical column (-1 = missing)."""
+        return self.arrays[col]
 
-    # 4. Feature Engineering
-    print("Engineering features...")
+    def categories(self, col):
+        return self.schema["columns"][col]["categories"]
+
+    def is_categorical(self, col):
+        return "categories" in self.schema["columns"][col]
+
+    def __getitem__(self, col):
+        if self.is_categorical(col):
+            return pd.Categorical.from_codes(self.arrays[col], categories=self.categories(col))
+        return self.arrays[col]
+
+    def to_frame(self, columns=None):
+        """Materializes (a projection of) the export as a DataFrame."""
+        return pd.DataFrame({col: self[col] for col in (columns or self.columns)})
+
+def export_delivery_arrays(df, out_dir=ARRAYS_DIR):
+    """
+    Writes the deliveries table as one .npy file per column plus schema.json, for
+    zero-copy sharing via DeliveryArrays. Categoricals are stored as int32 codes with
+    their categories in the schema. The export is swapped in atomically.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
     
-    # Phase
-    df['phase'] = pd.cut(df['over'], bins=[-1, 5, 15, 20], labels=['Powerplay', 'Middle', 'Death'])
+    schema = {"n_rows": len(df), "columns": {}}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            cat = series.astype('category').cat
+            file_name = f"{col}.codes.npy"
+            np.save(tmp_dir / file_name, cat.codes.to_numpy().astype(np.int32))
+            schema["columns"][col] = {
+                "file": file_name, "dtype": "int32",
+                "categories": [str(c) for c in cat.categories]
+            }
+        else:
+            file_name = f"{col}.npy"
+            values = series.to_numpy()
+            np.save(tmp_dir / file_name, values)
+            schema["columns"][col] = {"file": file_name, "dtype": str(values.dtype)}
     
-    # Cumulative stats (simple version)
-    # Ideally should be historical, but for prototype we just use global stats
+    with open(tmp_dir / "schema.json", "w") as f:
+        json.dump(schema, f)
     
-    # Save
-    df.to_pickle(cache_path)
-    print(f"Data processed and saved to {cache_path}")
-    return df
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+def open_delivery_arrays(path=ARRAYS_DIR):
+    """Opens an export written by export_delivery_arrays (memory-mapped, zero-copy)."""
+    return DeliveryArrays(path)
+
+def legal_delivery_mask(df):
+    """True for deliveries that count towards the over (not a wide or no-ball)."""
+    if 'extras_wides' not in df:
+        return pd.Series(True, index=df.index) if isinstance(df, pd.DataFrame) else np.ones(len(df), dtype=bool)
+    legal = (np.asarray(df['extras_wides']) == 0) & (np.asarray(df['extras_noballs']) == 0)
+    return pd.Series(legal, index=df.index) if isinstance(df, pd.DataFrame) else legal
+
+def delivery_flags(df):
+    """
+    Column-wise counting flags for aggregations:
+      faced: balls faced by the batter (everything except wides)
+      legal: balls bowled by the bowler (excludes wides and no-balls)
+      bowler_runs: runs charged to the bowler (byes and leg-byes excluded)
+    Stores without the extras columns fall back to counting every delivery.
+    """
+    runs_total = np.asarray(df['runs_total']).astype(np.int64)
+    if 'extras_wides' not in df:
+        ones = np.ones(len(runs_total), dtype=bool)
+        return {'faced': ones, 'legal': ones, 'bowler_runs': runs_total}
+    wides = np.asarray(df['extras_wides'])
+    noballs = np.asarray(df['extras_noballs'])
+    return {
+        'faced': wides == 0,
+        'legal': (wides == 0) & (noballs == 0),
+        'bowler_runs': runs_total - np.asarray(df['extras_byes']) - np.asarray(df['extras_legbyes'])
+    }
 
 def get_player_stats(df):
-    """Aggregates player stats from the dataframe."""
-    batter_stats = df.groupby('batter').agg(
+    """
+    Aggregates player stats from the dataframe.
+    Balls faced exclude wides and balls bowled exclude wides and no-balls; byes and
+    leg-byes are not charged to the bowler.
+    Also accepts a DeliveryArrays export, aggregated straight from the mapped arrays.
+    """
+    if isinstance(df, DeliveryArrays):
+        return _player_stats_from_arrays(df)
+    
+    flags = delivery_flags(df)
+    counts = pd.DataFrame({
+        'batter': df['batter'],
+        'bowler': df['bowler'],
+        'runs_batter': df['runs_batter'].astype(np.int64),
+        'is_wicket': df['is_wicket'].astype(np.int64),
+        'faced': flags['faced'].astype(np.int64),
+        'legal': flags['legal'].astype(np.int64),
+        'bowler_runs': flags['bowler_runs']
+    }, index=df.index)
+    
+    batter_stats = counts.groupby('batter', observed=True).agg(
         runs=('runs_batter', 'sum'),
-        balls=('ball', 'count'),
+        balls=('faced', 'sum'),
         dismissals=('is_wicket', 'sum')
     ).reset_index()
-    batter_stats['strike_rate'] = (batter_stats['runs'] / batter_stats['balls']) * 100
+    batter_stats['strike_rate'] = (batter_stats['runs'] / np.maximum(1, batter_stats['balls'])) * 100
     batter_stats['avg'] = batter_stats['runs'] / np.maximum(1, batter_stats['dismissals'])
     
-    bowler_stats = df.groupby('bowler').agg(
-        balls_bowled=('ball', 'count'),
-        runs_conceded=('runs_total', 'sum'),
+    bowler_stats = counts.groupby('bowler', observed=True).agg(
+        balls_bowled=('legal', 'sum'),
+        runs_conceded=('bowler_runs', 'sum'),
         wickets=('is_wicket', 'sum')
     ).reset_index()
-    bowler_stats['economy'] = (bowler_stats['runs_conceded'] / bowler_stats['balls_bowled']) * 6
+    bowler_stats['economy'] = (bowler_stats['runs_conceded'] / np.maximum(1, bowler_stats['balls_bowled'])) * 6
+    
+    return batter_stats, bowler_stats
+
+def _player_stats_from_arrays(arrays):
+    """get_player_stats over mapped code arrays: one bincount per aggregate, no DataFrame copy."""
+    flags = delivery_flags(arrays)
+    
+    def _sums(col, values):
+        codes = np.asarray(arrays.codes(col))
+        valid = codes >= 0
+        n = len(arrays.categories(col))
+        sums = np.bincount(codes[valid], weights=np.asarray(values)[valid], minlength=n)
+        return sums.astype(np.int64)
+    
+    def _rows(col):
+        codes = np.asarray(arrays.codes(col))
+        return np.bincount(codes[codes >= 0], minlength=len(arrays.categories(col))) > 0
+    
+    seen = _rows('batter')
+    batter_stats = pd.DataFrame({
+        'batter': np.array(arrays.categories('batter'), dtype=object)[seen],
+        'runs': _sums('batter', arrays['runs_batter'])[seen],
+        'balls': _sums('batter', flags['faced'])[seen],
+        'dismissals': _sums('batter', arrays['is_wicket'])[seen]
+    })
+    batter_stats['strike_rate'] = (batter_stats['runs'] / np.maximum(1, batter_stats['balls'])) * 100
+    batter_stats['avg'] = batter_stats['runs'] / np.maximum(1, batter_stats['dismissals'])
+    
+    seen = _rows('bowler')
+    bowler_stats = pd.DataFrame({
+        'bowler': np.array(arrays.categories('bowler'), dtype=object)[seen],
+        'balls_bowled': _sums('bowler', flags['legal'])[seen],
+        'runs_conceded': _sums('bowler', flags['bowler_runs'])[seen],
+        'wickets': _sums('bowler', arrays['is_wicket'])[seen]
+    })
+    bowler_stats['economy'] = (bowler_stats['runs_conceded'] / np.maximum(1, bowler_stats['balls_bowled'])) * 6
     
     return batter_stats, bowler_stats
 
 if __name__ == "__main__":
-    process_data(limit=100)
+    process_data(limit=None)
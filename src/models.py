@@ -4,150 +4,935 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pandas as pd
 import numpy as np
-import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import accuracy_score, log_loss
 from pathlib import Path
+from collections import OrderedDict
+import threading
+import time
+import json
+import hashlib
+import shutil
+import datetime
+# sklearn / joblib are imported lazily: loading a bundle and predicting through the
+# compiled path needs neither, which keeps worker cold start and RSS down
 
 # Config
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(exist_ok=True)
+BUNDLE_DIR = MODEL_DIR / "bundle" # manifest.json + model.joblib + arrays/*.npy
+BUNDLE_FORMAT = 1
+
+# Match context computed at ingest (data_loader.add_context_features), all as of *before* the ball:
+# running innings score / wickets, runs per over still needed in a chase, venue scoring rate
+# in earlier matches, and each player's runs per ball over their previous FORM_WINDOW deliveries
+CONTEXT_COLUMNS = ('innings_runs', 'innings_wickets', 'required_rate', 'venue_run_rate', 'batter_form', 'bowler_form')
+FORM_WINDOW = 60
+# Rates are shrunk towards the league rate with this many pseudo-balls (players/venues with little history)
+CONTEXT_PRIOR_BALLS = 30
+LEAGUE_RUNS_PER_BALL = 1.25
+MAX_REQUIRED_RATE = 36.0
+# Context values used when a state does not carry them
+CONTEXT_DEFAULTS = {
+    'innings_runs': 0, 'innings_wickets': 0, 'required_rate': 0.0,
+    'venue_run_rate': LEAGUE_RUNS_PER_BALL, 'batter_form': LEAGUE_RUNS_PER_BALL, 'bowler_form': LEAGUE_RUNS_PER_BALL
+}
+# State fields that determine a prediction (cache key)
+STATE_KEYS = ('over', 'ball', 'innings', 'batter', 'bowler', 'phase') + CONTEXT_COLUMNS
+# Model input columns, in order; the *_code columns are categorical.
+# Models trained before the context features use only the first six (see NeuroPredictor.feature_columns).
+BASE_FEATURE_COLUMNS = ('over', 'ball', 'innings', 'batter_code', 'bowler_code', 'phase_code')
+FEATURE_COLUMNS = BASE_FEATURE_COLUMNS + CONTEXT_COLUMNS
+CATEGORICAL_FEATURES = (3, 4, 5)
+# Batches up to this many rows use the compiled path; sklearn's Cython traversal
+# amortizes its per-call overhead better on large batches
+COMPILED_MAX_ROWS = 256
+# Players with fewer deliveries than this are folded into the unknown code at fit time, and
+# the least-used players are folded until it covers at least UNKNOWN_MIN_SHARE of rows, so
+# the code unseen players get at prediction time is trained on real (rare-player) deliveries
+MIN_PLAYER_DELIVERIES = 30
+UNKNOWN_MIN_SHARE = 0.01
+# Out-of-core training: store read size and share of (most recent) matches held out
+TRAINING_BATCH_ROWS = 250_000
+VALIDATION_FRACTION = 0.1
+# Backends that early-stop get the most recent EARLY_STOPPING_FRACTION of the *training*
+# matches as their stopping set, so the reported validation window stays untouched
+EARLY_STOPPING_BACKENDS = ('hgb',)
+EARLY_STOPPING_FRACTION = 0.1
+# Split codes for training rows
+TRAIN, STOP, VALIDATION = 0, 1, 2
+TRAINING_COLUMNS = ['date', 'innings', 'over', 'ball', 'legal_ball', 'batter', 'bowler', 'phase', 'runs_batter', 'is_wicket'] + list(CONTEXT_COLUMNS)
+
+def shrunk_rate(runs, balls, prior_balls=CONTEXT_PRIOR_BALLS):
+    """Runs per ball, pulled towards LEAGUE_RUNS_PER_BALL when there are few balls (vectorized)."""
+    return (runs + LEAGUE_RUNS_PER_BALL * prior_balls) / (balls + prior_balls)
+
+def required_run_rate(runs_needed, balls_bowled, total_balls=120):
+    """Runs per over still needed, clipped to [0, MAX_REQUIRED_RATE]; 0 where nothing is needed (vectorized)."""
+    balls_left = np.maximum(total_balls - np.asarray(balls_bowled), 1)
+    return np.clip(np.asarray(runs_needed) * 6 / balls_left, 0, MAX_REQUIRED_RATE)
+
+def time_split_cutoff(match_dates, val_fraction=VALIDATION_FRACTION):
+    """
+    Date from which matches are held out for validation: the most recent val_fraction
+    of matches (whole days stay on one side). None if no sensible split exists.
+    """
+    dates = np.sort(pd.to_datetime(pd.Series(list(match_dates))).dropna().to_numpy())
+    if val_fraction <= 0 or len(dates) < 2:
+        return None
+    cutoff = dates[min(int(len(dates) * (1 - val_fraction)), len(dates) - 1)]
+    return pd.Timestamp(cutoff) if cutoff > dates[0] else None
+
+def split_codes(dates, cutoff=None, stop_cutoff=None):
+    """Per-row TRAIN / STOP / VALIDATION codes: rows on or after stop_cutoff, then cutoff."""
+    dates = pd.to_datetime(pd.Series(np.asarray(dates)))
+    codes = np.full(len(dates), TRAIN, dtype=np.int8)
+    if stop_cutoff is not None:
+        codes[np.asarray(dates >= stop_cutoff)] = STOP
+    if cutoff is not None:
+        codes[np.asarray(dates >= cutoff)] = VALIDATION
+    return codes
+
+def encode_outcomes(runs_batter, is_wicket):
+    """
+    Vectorized outcome labels: 7 for a wicket, else runs_batter if it is 1, 2, 3, 4 or 6,
+    else 0 (dots and unusual values such as 5).
+    """
+    runs = np.asarray(runs_batter)
+    outcome = np.where(np.isin(runs, [1, 2, 3, 4, 6]), runs, 0)
+    return np.where(np.asarray(is_wicket).astype(bool), 7, outcome).astype(np.int8)
+
+class PredictionCache:
+    """
+    Bounded, thread-safe LRU cache for state -> outcome probabilities.
+    Entries expire after `ttl` seconds (None = never); least recently used entries are
+    evicted beyond `maxsize`. Cached arrays are read-only.
+    """
+    def __init__(self, maxsize=4096, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stamp = entry
+                if self.ttl is None or time.monotonic() - stamp < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        value = np.array(value)
+        value.setflags(write=False)
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data),
+                    'maxsize': self.maxsize, 'ttl': self.ttl}
+
+class CategoryEncoder:
+    """
+    Hash-map label encoder with a reserved code for unseen values.
+    Known values get codes start..start+n-1; anything else gets unknown_code, which is
+    never a real category. Encoders fitted here use start=1, unknown_code=0.
+    fit/from_counts can leave rare values out of classes_ (min_count / unknown_share), so
+    the unknown code also appears in training data instead of being an unseen input.
+    """
+    def __init__(self, classes=(), start=1, unknown_code=0):
+        self.classes_ = list(classes)
+        self.start = start
+        self.unknown_code = unknown_code
+        self.mapping = {name: start + i for i, name in enumerate(self.classes_)}
+
+    def fit(self, values, min_count=1, unknown_share=0.0):
+        counts = pd.Series(values).dropna().value_counts()
+        self.__init__(_frequent_classes(counts, min_count, unknown_share), self.start, self.unknown_code)
+        return self
+
+    def fit_transform(self, values, min_count=1, unknown_share=0.0):
+        return self.fit(values, min_count, unknown_share).transform(values)
+
+    @classmethod
+    def from_counts(cls, counts, min_count=1, unknown_share=0.0, start=1, unknown_code=0):
+        """Encoder from a {value: count} Series (e.g. value_counts summed over batches)."""
+        return cls(_frequent_classes(counts, min_count, unknown_share), start, unknown_code)
+
+    def transform(self, values):
+        """Vectorized encoding of an array-like of values."""
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            # Encode each category once, then gather by the categorical codes
+            cat = pd.Categorical(values)
+            cat_codes = self.transform(list(cat.categories))
+            codes = np.asarray(cat.codes)
+            return np.where(codes >= 0, cat_codes[codes] if len(cat_codes) else self.unknown_code, self.unknown_code)
+        idx = pd.Index(self.classes_).get_indexer(pd.Series(values, dtype=object))
+        return np.where(idx >= 0, idx + self.start, self.unknown_code)
+
+    def encode(self, value):
+        """O(1) encoding of a single value."""
+        return self.mapping.get(value, self.unknown_code)
+
+    def to_dict(self):
+        return {'classes': self.classes_, 'start': self.start, 'unknown_code': self.unknown_code}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['classes'], data['start'], data['unknown_code'])
+
+    @classmethod
+    def from_label_encoder(cls, le):
+        """Wraps a legacy sklearn LabelEncoder artifact (codes 0..n-1; unknown gets n)."""
+        classes = [c.item() if hasattr(c, 'item') else c for c in le.classes_]
+        return cls(classes, start=0, unknown_code=len(classes))
+
+def _frequent_classes(counts, min_count=1, unknown_share=0.0):
+    """
+    Sorted values that keep their own code: everything with at least min_count rows,
+    minus the least frequent values needed to leave unknown_share of all rows uncoded.
+    """
+    counts = pd.Series(counts).sort_values(kind='stable')
+    folded = (counts < min_count) | (counts.cumsum() - counts < unknown_share * counts.sum())
+    return sorted(counts.index[~folded])
+
+class CategoricalBoostingClassifier:
+    """
+    HistGradientBoostingClassifier with native categorical splits on the player/phase codes.
+    HGB accepts at most 255 categories per feature, so each categorical column keeps its
+    most frequent codes and folds the rest into the unknown code (0).
+    """
+    def __init__(self, categorical_features=CATEGORICAL_FEATURES, max_categories=254, **params):
+        self.categorical_features = tuple(categorical_features)
+        self.max_categories = max_categories
+        self.params = params
+
+    def fit(self, X, y, X_val=None, y_val=None):
+        """X_val / y_val (e.g. a later time window) drive early stopping when given."""
+        X = np.asarray(X)
+        self.category_maps_ = {}
+        for col in self.categorical_features:
+            counts = np.bincount(X[:, col].astype(np.int64))
+            keep = np.argsort(counts, kind='stable')[::-1][:self.max_categories - 1]
+            lut = np.zeros(len(counts), dtype=np.int64)
+            lut[keep] = keep
+            self.category_maps_[col] = lut
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        validation = {'X_val': self.transform(X_val), 'y_val': y_val} if X_val is not None and len(X_val) else {}
+        self.model_ = HistGradientBoostingClassifier(
+            categorical_features=list(self.categorical_features), **self.params
+        ).fit(self.transform(X), y, **validation)
+        self.classes_ = self.model_.classes_
+        return self
+
+    def transform(self, X):
+        """Folds rare / unseen category codes into 0."""
+        X = np.array(X, dtype=float)
+        for col, lut in self.category_maps_.items():
+            codes = X[:, col].astype(np.int64)
+            in_range = (codes >= 0) & (codes < len(lut))
+            X[:, col] = np.where(in_range, lut[np.clip(codes, 0, len(lut) - 1)], 0)
+        return X
+
+    def predict_proba(self, X):
+        return self.model_.predict_proba(self.transform(X))
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def make_forest():
+    from sklearn.ensemble import RandomForestClassifier
+    # Using RF for multi-class proba support out of box
+    return RandomForestClassifier(n_estimators=100, max_depth=10, n_jobs=-1, random_state=42)
+
+def make_boosting():
+    return CategoricalBoostingClassifier(
+        max_iter=200, learning_rate=0.1, max_leaf_nodes=31, min_samples_leaf=40,
+        l2_regularization=1.0, early_stopping=True, n_iter_no_change=10, random_state=42
+    )
+
+# backend name -> factory for an unfitted outcome model
+MODEL_BACKENDS = {
+    'forest': make_forest,
+    'hgb': make_boosting,
+}
+
+class CompiledEnsemble:
+    """
+    Low-overhead inference for fitted tree ensembles.
+    Every tree is flattened into shared node arrays and all trees are walked together,
+    one vectorized step per tree level, which avoids sklearn's per-call validation and
+    thread dispatch (dominant for single rows and small batches).
+    Supports RandomForestClassifier and CategoricalBoostingClassifier.
+    """
+    CHUNK_ROWS = 2048
+
+    def __init__(self, roots, feature, threshold, left, right, missing_left, leaf_value,
+                 max_depth, classes, mode, baseline=None, n_per_iteration=1,
+                 cat_row=None, cat_left=None, known=None, input_maps=None, column_order=None):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.leaf_value = leaf_value
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.mode = mode
+        self.baseline = baseline
+        self.n_per_iteration = n_per_iteration
+        self.cat_row = cat_row
+        self.cat_left = cat_left
+        self.known = known
+        self.input_maps = input_maps or {}
+        self.column_order = column_order
+
+    @classmethod
+    def from_model(cls, model):
+        from sklearn.ensemble import RandomForestClassifier
+        if isinstance(model, RandomForestClassifier):
+            return cls.from_forest(model)
+        if isinstance(model, CategoricalBoostingClassifier):
+            return cls.from_boosting(model)
+        raise TypeError(f"Cannot compile {type(model).__name__}")
+
+    @classmethod
+    def from_forest(cls, forest):
+        roots, feature, threshold, left, right, missing, values = [], [], [], [], [], [], []
+        offset = 0
+        for est in forest.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            idx = np.arange(n)
+            leaf = tree.children_left < 0
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            # Leaves point at themselves so extra steps are no-ops
+            left.append(np.where(leaf, idx, tree.children_left) + offset)
+            right.append(np.where(leaf, idx, tree.children_right) + offset)
+            missing.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(n)), dtype=bool))
+            value = tree.value[:, 0, :]
+            values.append(value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12))
+            offset += n
+        return cls(
+            np.array(roots), np.concatenate(feature), np.concatenate(threshold),
+            np.concatenate(left), np.concatenate(right), np.concatenate(missing),
+            np.concatenate(values) / len(forest.estimators_),
+            max(est.tree_.max_depth for est in forest.estimators_), forest.classes_, 'mean'
+        )
+
+    @classmethod
+    def from_boosting(cls, wrapper):
+        hgb = wrapper.model_
+        preprocessor = hgb._preprocessor
+        categorical = np.flatnonzero(hgb.is_categorical_)
+        numerical = np.flatnonzero(~hgb.is_categorical_)
+        # HGB puts ordinal-encoded categorical columns first: raw code -> ordinal (NaN = unknown)
+        input_maps = {}
+        for col, categories in zip(categorical, preprocessor.named_transformers_['encoder'].categories_):
+            categories = categories[~np.isnan(categories)].astype(np.int64)
+            lut = np.full(categories.max() + 2 if len(categories) else 1, np.nan)
+            lut[categories] = np.arange(len(categories))
+            input_maps[col] = lut
+        known_bits, f_idx_map = hgb._bin_mapper.make_known_categories_bitsets()
+        known = _bitsets_to_bool(known_bits)[f_idx_map]
+
+        roots, feature, threshold, left, right, missing, values, depth = [], [], [], [], [], [], [], []
+        cat_row, cat_left = [], []
+        offset, n_cat = 0, 0
+        for predictors in hgb._predictors:
+            for predictor in predictors:
+                nodes = predictor.nodes
+                n = len(nodes)
+                idx = np.arange(n)
+                leaf = nodes['is_leaf'].astype(bool)
+                roots.append(offset)
+                feature.append(nodes['feature_idx'].astype(np.intp))
+                threshold.append(nodes['num_threshold'])
+                left.append(np.where(leaf, idx, nodes['left']) + offset)
+                right.append(np.where(leaf, idx, nodes['right']) + offset)
+                missing.append(nodes['missing_go_to_left'].astype(bool))
+                values.append(np.where(leaf, nodes['value'], 0.0))
+                depth.append(nodes['depth'].max())
+                is_cat = nodes['is_categorical'].astype(bool) & ~leaf
+                bitsets = _bitsets_to_bool(predictor.raw_left_cat_bitsets)
+                rows = np.full(n, -1)
+                rows[is_cat] = np.arange(is_cat.sum()) + n_cat
+                cat_row.append(rows)
+                cat_left.append(bitsets[nodes['bitset_idx'][is_cat]] if is_cat.any() else np.zeros((0, 256), dtype=bool))
+                n_cat += int(is_cat.sum())
+                offset += n
+        return cls(
+            np.array(roots), np.concatenate(feature), np.concatenate(threshold),
+            np.concatenate(left), np.concatenate(right), np.concatenate(missing),
+            np.concatenate(values), int(max(depth)), wrapper.classes_, 'boosting',
+            baseline=hgb._baseline_prediction.ravel(), n_per_iteration=hgb.n_trees_per_iteration_,
+            cat_row=np.concatenate(cat_row), cat_left=np.concatenate(cat_left), known=known,
+            input_maps={'wrapper': wrapper.category_maps_, 'ordinal': input_maps},
+            column_order=np.concatenate([categorical, numerical])
+        )
+
+    # Array attributes persisted in a model bundle (None-valued ones are skipped)
+    ARRAY_FIELDS = ('roots', 'feature', 'threshold', 'left', 'right', 'missing_left', 'leaf_value',
+                    'classes_', 'baseline', 'cat_row', 'cat_left', 'known', 'column_order')
+
+    def to_arrays(self):
+        """(meta, arrays): JSON-able settings plus named ndarrays, for saving in a bundle."""
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.ARRAY_FIELDS if getattr(self, name) is not None}
+        maps = {}
+        for kind, luts in self.input_maps.items():
+            for col, lut in luts.items():
+                arrays[f"map_{kind}_{col}"] = lut
+                maps.setdefault(kind, []).append(int(col))
+        meta = {'mode': self.mode, 'max_depth': int(self.max_depth),
+                'n_per_iteration': int(self.n_per_iteration), 'input_maps': maps}
+        return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        """Inverse of to_arrays; arrays may be memory-mapped."""
+        fields = {name: arrays.get(name) for name in cls.ARRAY_FIELDS}
+        classes = fields.pop('classes_')
+        input_maps = {kind: {col: arrays[f"map_{kind}_{col}"] for col in cols}
+                      for kind, cols in meta['input_maps'].items()}
+        return cls(max_depth=meta['max_depth'], classes=classes, mode=meta['mode'],
+                   n_per_iteration=meta['n_per_iteration'], input_maps=input_maps, **fields)
+
+    def _prepare(self, X):
+        if self.mode == 'mean':
+            # Trees split on float32 features
+            return np.asarray(X, dtype=np.float32)
+        X = np.array(X, dtype=float)
+        for col, lut in self.input_maps['wrapper'].items():
+            codes = X[:, col].astype(np.int64)
+            X[:, col] = np.where((codes >= 0) & (codes < len(lut)), lut[np.clip(codes, 0, len(lut) - 1)], 0)
+        for col, lut in self.input_maps['ordinal'].items():
+            codes = X[:, col].astype(np.int64)
+            X[:, col] = lut[np.clip(codes, 0, len(lut) - 1)]
+        return X[:, self.column_order]
+
+    def _leaves(self, X):
+        """Leaf index reached in every tree, shape (n_rows, n_trees)."""
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            f = self.feature[node]
+            x = X[rows, f]
+            missing = np.isnan(x)
+            go_left = x <= self.threshold[node]
+            if self.cat_row is not None and len(self.cat_left):
+                cat_row = self.cat_row[node]
+                is_cat = cat_row >= 0
+                if is_cat.any():
+                    code = np.where(missing, 0, x).astype(np.intp).clip(0, 255)
+                    in_left = self.cat_left[np.maximum(cat_row, 0), code]
+                    # Categories never seen in training are treated as missing
+                    known = self.known[f, code] & ~missing
+                    go_left = np.where(is_cat, in_left & known, go_left)
+                    missing |= is_cat & ~known
+            go_left = np.where(missing, self.missing_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X):
+        X = self._prepare(X)
+        out = []
+        for start in range(0, len(X), self.CHUNK_ROWS):
+            leaves = self._leaves(X[start:start + self.CHUNK_ROWS])
+            if self.mode == 'mean':
+                out.append(self.leaf_value[leaves].sum(axis=1))
+                continue
+            raw = self.leaf_value[leaves].reshape(len(leaves), -1, self.n_per_iteration).sum(axis=1) + self.baseline
+            if self.n_per_iteration == 1:
+                p = 1 / (1 + np.exp(-raw[:, 0]))
+                out.append(np.column_stack([1 - p, p]))
+            else:
+                raw -= raw.max(axis=1, keepdims=True)
+                e = np.exp(raw)
+                out.append(e / e.sum(axis=1, keepdims=True))
+        return np.concatenate(out) if out else np.zeros((0, len(self.classes_)))
+
+def _bitsets_to_bool(bitsets):
+    """(n, 8) uint32 bitsets over 256 categories -> (n, 256) bool."""
+    bitsets = np.ascontiguousarray(bitsets, dtype='<u4')
+    return np.unpackbits(bitsets.view(np.uint8), axis=1, bitorder='little').astype(bool)
+
+def compile_model(model, X_check):
+    """
+    CompiledEnsemble for model, or None if the model type is unsupported or the compiled
+    probabilities disagree with model.predict_proba on X_check.
+    """
+    try:
+        compiled = CompiledEnsemble.from_model(model)
+        if np.allclose(compiled.predict_proba(X_check), model.predict_proba(X_check), atol=1e-6):
+            return compiled
+        print("Compiled inference disagrees with the model; using predict_proba.")
+    except (TypeError, AttributeError, KeyError, IndexError, ValueError) as e:
+        print(f"Compiled inference unavailable ({e}); using predict_proba.")
+    return None
 
 class NeuroPredictor:
-    def __init__(self):
-        self.outcome_model = None
-        self.le_batter = LabelEncoder()
-        self.le_bowler = LabelEncoder()
-        self.le_phase = LabelEncoder()
+    def __init__(self, backend='forest', cache_size=4096, cache_ttl=300):
+        self.backend = backend
+        self._outcome_model = None
+        self._model_path = None # bundle model.joblib, loaded on first use
+        self.compiled = None
+        self.model_version = None
+        self.feature_columns = FEATURE_COLUMNS
+        self.enc_batter = CategoryEncoder()
+        self.enc_bowler = CategoryEncoder()
+        self.enc_phase = CategoryEncoder()
+        self.prob_cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
         
+    @property
+    def outcome_model(self):
+        """The fitted sklearn-style model; lazily loaded from the bundle when first needed."""
+        if self._outcome_model is None and self._model_path is not None:
+            import joblib
+            self._outcome_model = joblib.load(self._model_path)
+        return self._outcome_model
+
+    @outcome_model.setter
+    def outcome_model(self, model):
+        self._outcome_model = model
+        self._model_path = None
+
+    @property
+    def classes_(self):
+        """Outcome classes, without loading the sklearn model when a compiled path exists."""
+        return self.compiled.classes_ if self.compiled is not None else self.outcome_model.classes_
+
     def prepare_data(self, df):
-        """Prepares features and targets for training."""
+        """
+        Prepares features and targets for training. Does not modify df.
+        df may also be a memory-mapped DeliveryArrays export (data_loader.open_delivery_arrays).
+        """
         # Target: simplify to discrete outcomes
         # 0, 1, 2, 3, 4, 6, W (encoded as 7)
-        
-        def encode_outcome(row):
-            if row['is_wicket']: return 7
-            if row['runs_batter'] == 6: return 6
-            if row['runs_batter'] == 4: return 4
-            if row['runs_batter'] == 3: return 3
-            if row['runs_batter'] == 2: return 2
-            if row['runs_batter'] == 1: return 1
-            return 0
-            
-        df['outcome'] = df.apply(encode_outcome, axis=1)
+        y = pd.Series(encode_outcomes(df['runs_batter'], df['is_wicket']), index=df.index, name='outcome')
         
         # Features
         # Using encoding for IDs is primitive but works for prototype
-        # Need to handle unseen labels in production (using 'unknown')
+        # Unseen labels at prediction time map to each encoder's reserved unknown code
         
         # Filter for top N players to keep dimensionality manageable or use LabelEncoder
         # valid_batters = df['batter'].value_counts().index[:500]
         # valid_bowlers = df['bowler'].value_counts().index[:300]
         # df = df[df['batter'].isin(valid_batters) & df['bowler'].isin(valid_bowlers)]
         
-        df['batter_code'] = self.le_batter.fit_transform(df['batter'])
-        df['bowler_code'] = self.le_bowler.fit_transform(df['bowler'])
-        df['phase_code'] = self.le_phase.fit_transform(df['phase'].astype(str))
-        
-        features = ['over', 'ball', 'innings', 'batter_code', 'bowler_code', 'phase_code']
-        target = 'outcome'
+        self.feature_columns = FEATURE_COLUMNS
+        self.enc_batter.fit(df['batter'], MIN_PLAYER_DELIVERIES, UNKNOWN_MIN_SHARE)
+        self.enc_bowler.fit(df['bowler'], MIN_PLAYER_DELIVERIES, UNKNOWN_MIN_SHARE)
+        self.enc_phase.fit(pd.Series(df['phase']).astype(str))
         
-        return df[features], df[target]
+        return self._feature_frame(df), y
+
+    def _feature_frame(self, df):
+        """Model features (self.feature_columns) for deliveries, using the already-fitted encoders."""
+        # Assemble the feature frame column by column instead of adding columns to df
+        columns = {
+            'over': np.asarray(df['over']),
+            # Legal-ball index (1..6) when available, so wides/no-balls don't shift ball numbers
+            'ball': np.asarray(df['legal_ball'] if 'legal_ball' in df else df['ball']),
+            'innings': np.asarray(df['innings']),
+            'batter_code': self.enc_batter.transform(df['batter']),
+            'bowler_code': self.enc_bowler.transform(df['bowler']),
+            'phase_code': self.enc_phase.transform(pd.Series(df['phase']).astype(str))
+        }
+        for col in CONTEXT_COLUMNS:
+            # Deliveries without precomputed context get the neutral defaults
+            columns[col] = np.asarray(df[col], dtype=np.float32) if col in df else np.full(len(df), CONTEXT_DEFAULTS[col], dtype=np.float32)
+        return pd.DataFrame({col: columns[col] for col in self.feature_columns}, index=df.index, copy=False)
 
     def train(self, df):
         print("Preparing training data...")
         X, y = self.prepare_data(df)
+        X, y = X.to_numpy(), y.to_numpy() # Fit on plain arrays: prediction paths pass arrays, not named frames
         
         print("Splitting data...")
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        print("Training Random Forest (this may take a moment)...")
-        # Using RF for multi-class proba support out of box
-        self.outcome_model = RandomForestClassifier(
-            n_estimators=100, 
-            max_depth=10, 
-            n_jobs=-1,
-            random_state=42
-        )
-        self.outcome_model.fit(X_train, y_train)
+        cutoff = time_split_cutoff(pd.Series(df['date']).unique()) if 'date' in df else None
+        if cutoff is not None:
+            # Hold out the most recent matches, as the model will be used on future ones
+            dates = pd.to_datetime(pd.Series(np.asarray(df['date'])))
+            part = split_codes(dates, cutoff, self._stopping_cutoff(dates[dates < cutoff].unique()))
+            print(f"Validating on matches from {cutoff.date()} on ({(part == VALIDATION).sum():,} deliveries)")
+        else:
+            # No usable dates: random hold-out (early-stopping backends then stop on
+            # sklearn's own random slice of the training rows)
+            part = np.where(np.random.default_rng(42).random(len(X)) < 0.2, VALIDATION, TRAIN).astype(np.int8)
+        
+        self._fit(X[part == TRAIN], y[part == TRAIN], X[part == STOP], y[part == STOP])
+        self._evaluate(X[part == VALIDATION], y[part == VALIDATION])
+
+    def _stopping_cutoff(self, train_dates):
+        """Start of the early-stopping slice within the training window (None if the backend doesn't early-stop)."""
+        return time_split_cutoff(train_dates, EARLY_STOPPING_FRACTION) if self.backend in EARLY_STOPPING_BACKENDS else None
+
+    def train_incremental(self, batches=None, val_fraction=VALIDATION_FRACTION, batch_rows=TRAINING_BATCH_ROWS):
+        """
+        Out-of-core training over the whole processed store.
+        Deliveries are streamed in batches twice: first to collect player/phase
+        vocabularies, match dates and rows per date, then to encode each batch straight
+        into float32 feature arrays preallocated from those counts (no full DataFrame,
+        per-batch parts or concatenated copies in memory). Matches from the most recent
+        val_fraction of dates form the validation set; early-stopping backends stop on the
+        most recent EARLY_STOPPING_FRACTION of the remaining (training) matches.
+        batches: callable(columns) -> iterable of delivery DataFrames (default: the store).
+        Returns a dict of split sizes and validation metrics, or None if there is no data.
+        """
+        if batches is None:
+            from src.data_loader import iter_delivery_batches
+            batches = lambda columns: iter_delivery_batches(columns, batch_rows)
         
+        print("Scanning deliveries (pass 1/2)...")
+        batters, bowlers, phases, match_dates = pd.Series(dtype=np.int64), pd.Series(dtype=np.int64), set(), {}
+        date_rows = pd.Series(dtype=np.int64)
+        for chunk in batches(['match_id', 'date', 'batter', 'bowler', 'phase']):
+            date_rows = date_rows.add(pd.to_datetime(pd.Series(np.asarray(chunk['date']))).value_counts(dropna=False), fill_value=0)
+            batters = batters.add(pd.Series(np.asarray(chunk['batter'], dtype=object)).value_counts(), fill_value=0)
+            bowlers = bowlers.add(pd.Series(np.asarray(chunk['bowler'], dtype=object)).value_counts(), fill_value=0)
+            phases.update(pd.Series(chunk['phase']).astype(str).unique())
+            firsts = pd.DataFrame({'match_id': np.asarray(chunk['match_id']), 'date': np.asarray(chunk['date'])}).drop_duplicates('match_id')
+            match_dates.update(zip(firsts['match_id'], firsts['date']))
+        if not match_dates:
+            print("No data available for training.")
+            return None
+        
+        self.feature_columns = FEATURE_COLUMNS
+        self.enc_batter = CategoryEncoder.from_counts(batters, MIN_PLAYER_DELIVERIES, UNKNOWN_MIN_SHARE)
+        self.enc_bowler = CategoryEncoder.from_counts(bowlers, MIN_PLAYER_DELIVERIES, UNKNOWN_MIN_SHARE)
+        self.enc_phase = CategoryEncoder(sorted(phases))
+        cutoff = time_split_cutoff(match_dates.values(), val_fraction)
+        train_dates = [d for d in pd.to_datetime(pd.Series(list(match_dates.values()))).dropna() if cutoff is None or d < cutoff]
+        stop_cutoff = self._stopping_cutoff(train_dates)
+        
+        # Exact split sizes from the per-date row counts, so each split is allocated once
+        sizes = np.bincount(split_codes(date_rows.index, cutoff, stop_cutoff),
+                            weights=date_rows.to_numpy(), minlength=3).astype(np.int64)
+        n_features = len(self.feature_columns)
+        X_parts = [np.empty((n, n_features), dtype=np.float32) for n in sizes]
+        y_parts = [np.empty(n, dtype=np.int8) for n in sizes]
+        filled = np.zeros(3, dtype=np.int64)
+        
+        print("Encoding deliveries (pass 2/2)...")
+        for chunk in batches(TRAINING_COLUMNS):
+            X = self._feature_frame(chunk).to_numpy(dtype=np.float32)
+            y = encode_outcomes(chunk['runs_batter'], chunk['is_wicket'])
+            part = split_codes(chunk['date'], cutoff, stop_cutoff)
+            for code in (TRAIN, STOP, VALIDATION):
+                rows = part == code
+                n = int(rows.sum())
+                X_parts[code][filled[code]:filled[code] + n] = X[rows]
+                y_parts[code][filled[code]:filled[code] + n] = y[rows]
+                filled[code] += n
+            del chunk, X, y
+        (X_train, X_stop, X_val), (y_train, y_stop, y_val) = X_parts, y_parts
+        del X_parts, y_parts
+        
+        print(f"{len(X_train):,} training / {len(X_stop):,} early-stopping / {len(X_val):,} validation deliveries"
+              + (f" (validation: matches from {cutoff.date()} on)" if cutoff is not None else ""))
+        self._fit(X_train, y_train, X_stop, y_stop)
+        metrics = self._evaluate(X_val, y_val)
+        return {'n_train': len(X_train), 'n_stop': len(X_stop), 'n_val': len(X_val), 'cutoff': cutoff, **(metrics or {})}
+
+    def _fit(self, X_train, y_train, X_stop=None, y_stop=None):
+        """X_stop / y_stop: early-stopping set (kept apart from the reported validation set)."""
+        print(f"Training {self.backend} outcome model (this may take a moment)...")
+        self.outcome_model = MODEL_BACKENDS[self.backend]()
+        if isinstance(self.outcome_model, CategoricalBoostingClassifier):
+            self.outcome_model.fit(X_train, y_train, X_stop, y_stop)
+        else:
+            self.outcome_model.fit(X_train, y_train)
+        self._compile()
+        # Predictions cached for the previous model/encoders are stale now
+        self.prob_cache.clear()
+
+    def _evaluate(self, X_test, y_test):
+        """Prints (and returns) held-out accuracy and log-loss."""
+        from sklearn.metrics import accuracy_score, log_loss
         # Evaulate
         try:
-            probs = self.outcome_model.predict_proba(X_test)
+            probs = self._predict_proba(X_test)
             # Handle single-class case in test set
             if len(np.unique(y_test)) > 1:
                 loss = log_loss(y_test, probs, labels=self.outcome_model.classes_)
-                acc = accuracy_score(y_test, self.outcome_model.predict(X_test))
+                acc = accuracy_score(y_test, self.outcome_model.classes_[probs.argmax(axis=1)])
                 print(f"Model Trained. Accuracy: {acc:.3f}, Log Loss: {loss:.3f}")
+                return {'accuracy': acc, 'log_loss': loss}
             else:
                 print("Model Trained. (Skipping metrics: Insufficient class variance in test set)")
         except Exception as e:
             print(f"Model Trained. (Metrics calculation failed: {e})")
+        return None
+        
+    def save_model(self, path=BUNDLE_DIR):
+        """
+        Writes one versioned bundle directory:
+        manifest.json (format version, backend, classes, feature schema, encoder tables,
+        compiled-ensemble settings, per-file sha256 and a content hash), model.joblib
+        and arrays/*.npy (the compiled ensemble, memory-mappable).
+        The bundle is assembled next to `path` and swapped in at the end.
+        """
+        import joblib
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        (tmp / "arrays").mkdir(parents=True)
+        
+        joblib.dump(self.outcome_model, tmp / "model.joblib")
+        compiled_meta = None
+        if self.compiled is not None:
+            compiled_meta, arrays = self.compiled.to_arrays()
+            for name, array in arrays.items():
+                np.save(tmp / "arrays" / f"{name}.npy", np.ascontiguousarray(array))
+        
+        files = {str(f.relative_to(tmp).as_posix()): file_digest(f) for f in sorted(tmp.rglob("*")) if f.is_file()}
+        manifest = {
+            'format_version': BUNDLE_FORMAT,
+            'backend': self.backend,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'classes': np.asarray(self.classes_).tolist(),
+            'features': {'columns': list(self.feature_columns), 'categorical': list(CATEGORICAL_FEATURES)},
+            'encoders': {
+                'batter': self.enc_batter.to_dict(),
+                'bowler': self.enc_bowler.to_dict(),
+                'phase': self.enc_phase.to_dict()
+            },
+            'compiled': compiled_meta,
+            'files': files
+        }
+        manifest['content_hash'] = bundle_hash(manifest)
+        with open(tmp / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=1)
+        
+        old = path.with_name(path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if path.exists():
+            path.rename(old)
+        tmp.rename(path)
+        shutil.rmtree(old, ignore_errors=True)
+        self.model_version = manifest['content_hash'][:12]
+        print(f"Model bundle {self.model_version} saved to {path}.")
+
+    def load_model(self, path=BUNDLE_DIR, verify=False):
+        """
+        Loads the model bundle (or legacy outcome_model.joblib artifacts).
+        Compiled-ensemble arrays are memory-mapped, so worker processes share one copy;
+        the sklearn model itself is only unpickled if a prediction needs it.
+        verify: re-hash every bundle file against the manifest (ValueError on mismatch).
+        """
+        manifest_path = Path(path) / "manifest.json"
+        if not manifest_path.exists():
+            return self._load_legacy()
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version', 0) > BUNDLE_FORMAT:
+            raise ValueError(f"Model bundle format {manifest['format_version']} is newer than supported ({BUNDLE_FORMAT})")
+        if verify:
+            verify_bundle(path, manifest)
         
-    def save_model(self):
-        joblib.dump(self.outcome_model, MODEL_DIR / "outcome_model.joblib")
-        joblib.dump(self.le_batter, MODEL_DIR / "le_batter.joblib")
-        joblib.dump(self.le_bowler, MODEL_DIR / "le_bowler.joblib")
-        joblib.dump(self.le_phase, MODEL_DIR / "le_phase.joblib")
-        print("Models saved.")
+        self.backend = manifest['backend']
+        self.feature_columns = tuple(manifest['features']['columns'])
+        self.enc_batter = CategoryEncoder.from_dict(manifest['encoders']['batter'])
+        self.enc_bowler = CategoryEncoder.from_dict(manifest['encoders']['bowler'])
+        self.enc_phase = CategoryEncoder.from_dict(manifest['encoders']['phase'])
+        self._outcome_model = None
+        self._model_path = Path(path) / "model.joblib"
+        if manifest['compiled'] is not None:
+            arrays = {Path(name).stem: np.load(Path(path) / name, mmap_mode='r')
+                      for name in manifest['files'] if name.startswith('arrays/')}
+            self.compiled = CompiledEnsemble.from_arrays(manifest['compiled'], arrays)
+        else:
+            self.compiled = None
+        self.model_version = manifest['content_hash'][:12]
+        self.prob_cache.clear()
+        return True
 
-    def load_model(self):
+    def _load_legacy(self):
+        import joblib
         try:
             self.outcome_model = joblib.load(MODEL_DIR / "outcome_model.joblib")
-            self.le_batter = joblib.load(MODEL_DIR / "le_batter.joblib")
-            self.le_bowler = joblib.load(MODEL_DIR / "le_bowler.joblib")
-            self.le_phase = joblib.load(MODEL_DIR / "le_phase.joblib")
+            self.feature_columns = FEATURE_COLUMNS[:getattr(self.outcome_model, 'n_features_in_', len(FEATURE_COLUMNS))]
+            self._load_encoders()
+            self._compile()
+            self.model_version = None
+            self.prob_cache.clear()
             return True
         except FileNotFoundError:
             print("Models not found. Please train first.")
             return False
 
+    def _load_encoders(self):
+        encoders_path = MODEL_DIR / "encoders.json"
+        if encoders_path.exists():
+            with open(encoders_path) as f:
+                encoders = json.load(f)
+            self.enc_batter = CategoryEncoder.from_dict(encoders['batter'])
+            self.enc_bowler = CategoryEncoder.from_dict(encoders['bowler'])
+            self.enc_phase = CategoryEncoder.from_dict(encoders['phase'])
+        else:
+            # Artifacts from before encoders.json: one joblib LabelEncoder per column
+            import joblib
+            self.enc_batter = CategoryEncoder.from_label_encoder(joblib.load(MODEL_DIR / "le_batter.joblib"))
+            self.enc_bowler = CategoryEncoder.from_label_encoder(joblib.load(MODEL_DIR / "le_bowler.joblib"))
+            self.enc_phase = CategoryEncoder.from_label_encoder(joblib.load(MODEL_DIR / "le_phase.joblib"))
+
+    def _compile(self):
+        self.compiled = compile_model(self.outcome_model, self._probe_features())
+
+    def _probe_features(self, n=512, seed=0):
+        """Random in-range feature rows (including unknown codes) to validate the compiled path."""
+        rng = np.random.default_rng(seed)
+        columns = {
+            'over': rng.integers(0, 20, n),
+            'ball': rng.integers(1, 7, n),
+            'innings': rng.integers(1, 3, n),
+            'batter_code': rng.integers(0, len(self.enc_batter.classes_) + 2, n),
+            'bowler_code': rng.integers(0, len(self.enc_bowler.classes_) + 2, n),
+            'phase_code': rng.integers(0, len(self.enc_phase.classes_) + 2, n),
+            'innings_runs': rng.integers(0, 250, n),
+            'innings_wickets': rng.integers(0, 10, n),
+            'required_rate': rng.uniform(0, 18, n),
+            'venue_run_rate': rng.uniform(0.9, 1.6, n),
+            'batter_form': rng.uniform(0.5, 2.2, n),
+            'bowler_form': rng.uniform(0.7, 1.8, n)
+        }
+        return np.column_stack([columns[col] for col in self.feature_columns])
+
+    def _predict_proba(self, X):
+        """Outcome probabilities for a feature matrix, via the compiled path for small batches."""
+        if self.compiled is not None and len(X) <= COMPILED_MAX_ROWS:
+            return self.compiled.predict_proba(X)
+        return self.outcome_model.predict_proba(X)
+
+    def _encode_state(self, current_state):
+        """Feature row for a single state, in self.feature_columns order."""
+        columns = {
+            'over': current_state['over'],
+            'ball': current_state['ball'],
+            'innings': current_state['innings'],
+            'batter_code': self.enc_batter.encode(current_state['batter']),
+            'bowler_code': self.enc_bowler.encode(current_state['bowler']),
+            'phase_code': self.enc_phase.encode(str(current_state['phase']))
+        }
+        return [columns[col] if col in columns else current_state.get(col, CONTEXT_DEFAULTS[col])
+                for col in self.feature_columns]
+
+    def _encode_states(self, states):
+        """Feature matrix for a list of states, encoding each column in one vectorized pass."""
+        columns = {
+            'over': [state['over'] for state in states],
+            'ball': [state['ball'] for state in states],
+            'innings': [state['innings'] for state in states],
+            'batter_code': self.enc_batter.transform([state['batter'] for state in states]),
+            'bowler_code': self.enc_bowler.transform([state['bowler'] for state in states]),
+            'phase_code': self.enc_phase.transform([str(state['phase']) for state in states])
+        }
+        return np.column_stack([
+            columns[col] if col in columns else [state.get(col, CONTEXT_DEFAULTS[col]) for state in states]
+            for col in self.feature_columns
+        ])
+
     def predict_probs(self, current_state):
         """
         Returns outcome probabilities for a single state.
-        state format: {over, ball, innings, batter, bowler, phase}
+        state format: {over, ball, innings, batter, bowler, phase} plus optional
+        CONTEXT_COLUMNS keys (CONTEXT_DEFAULTS when absent)
+        Results are memoized in self.prob_cache.
         """
-        # Handle unseen labels by assigning a default (e.g., mode or special index)
-        # For prototype, we try/except and use 0 (often unlikely to match but safe crash-wise)
+        key = tuple(current_state.get(k) for k in STATE_KEYS)
+        cached = self.prob_cache.get(key)
+        if cached is not None:
+            return cached
         
-        try:
-            b_code = self.le_batter.transform([current_state['batter']])[0]
-        except:
-            b_code = 0 # Unknown
-            
-        try:
-            bw_code = self.le_bowler.transform([current_state['bowler']])[0]
-        except:
-            bw_code = 0 # Unknown
-            
-        try:
-            p_code = self.le_phase.transform([current_state['phase']])[0]
-        except:
-            p_code = 0
-            
-        X = np.array([[
-            current_state['over'],
-            current_state['ball'],
-            current_state['innings'],
-            b_code,
-            bw_code,
-            p_code
-        ]])
-        
-        return self.outcome_model.predict_proba(X)[0]
-
-def train_pipeline():
+        X = np.array([self._encode_state(current_state)])
+        
+        return self.prob_cache.put(key, self._predict_proba(X)[0])
+
+    def predict_probs_batch(self, states, use_cache=True):
+        """
+        Returns outcome probabilities for a list of states with a single predict_proba call
+        over the states missing from self.prob_cache.
+        use_cache=False skips the shared cache entirely (neither read nor filled), for callers
+        such as the stateful simulator whose many one-off states would evict the hot entries.
+        Shape: (len(states), n_classes).
+        """
+        if not use_cache:
+            return np.asarray(self._predict_proba(self._encode_states(states)))
+        keys = [tuple(state.get(k) for k in STATE_KEYS) for state in states]
+        rows = [self.prob_cache.get(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        
+        if missing:
+            X = self._encode_states([states[i] for i in missing])
+            for i, probs in zip(missing, self._predict_proba(X)):
+                rows[i] = self.prob_cache.put(keys[i], probs)
+        
+        return np.array(rows)
+
+    def cache_info(self):
+        """Hit/miss counters and size of the prediction cache."""
+        return self.prob_cache.info()
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def bundle_hash(manifest):
+    """Content hash of a bundle: every manifest field except 'created' and the hash itself."""
+    core = {k: v for k, v in manifest.items() if k not in ('created', 'content_hash')}
+    return hashlib.sha256(json.dumps(core, sort_keys=True).encode()).hexdigest()
+
+def verify_bundle(path, manifest):
+    for name, digest in manifest['files'].items():
+        if file_digest(Path(path) / name) != digest:
+            raise ValueError(f"Model bundle file {name} does not match its manifest hash")
+    if bundle_hash(manifest) != manifest['content_hash']:
+        raise ValueError("Model bundle manifest does not match its content hash")
+
+def train_pipeline(backend='forest', full=False):
+    """
+    full=False: quick prototype model trained on the first 200 matches (the store itself is
+    still brought up to date with every raw match).
+    full=True: ingest every match, then train out-of-core from the processed store.
+    """
     from src.data_loader import process_data
-    df = process_data(limit=200) # Limit for speed in prototype
+    if full:
+        process_data(limit=None) # Incremental: only new/changed matches are parsed
+        model = NeuroPredictor(backend=backend)
+        if model.train_incremental() is not None:
+            model.save_model()
+        return
+    
+    df = process_data(limit=200) # Train on a 200-match subset; ingest still covers every match
     if df.empty:
         print("No data available for training.")
         return
         
-    model = NeuroPredictor()
+    model = NeuroPredictor(backend=backend)
     model.train(df)
     model.save_model()
 
 if __name__ == "__main__":
-    train_pipeline()
+    # Usage: python src/models.py [forest|hgb] [--full]
+    args = [a for a in sys.argv[1:] if a != '--full']
+    train_pipeline(*args[:1], full='--full' in sys.argv)
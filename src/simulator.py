@@ -1,10 +1,34 @@
+import os
+import threading
 import numpy as np
 import pandas as pd
-from src.models import NeuroPredictor
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from src.models import NeuroPredictor, encode_outcomes, required_run_rate, CONTEXT_DEFAULTS
+
+# Outcome index -> runs / wicket flag
+RUN_MAP = np.array([0, 1, 2, 3, 4, 6, 0])
+WICKET_MAP = np.array([0, 0, 0, 0, 0, 0, 1])
+# Compact outcome maps for the streaming engine (index -> runs / wicket flag)
+STREAM_RUN_MAP = np.array([0, 1, 2, 3, 4, 6, 0], dtype=np.int8)
+STREAM_WICKET_MAP = np.array([0, 0, 0, 0, 0, 0, 1], dtype=np.int8)
+# Approximate peak bytes per simulated ball in one chunk: float64 uniforms + int64 draws
+# inside rng.choice, then int8 outcomes/gathers, two int16 cumsums and comparison masks
+STREAM_BYTES_PER_BALL = 24
+# Sims per independently-seeded block in the parallel engine. Fixed (not derived from the
+# worker count) so a given seed always produces the same blocks.
+PARALLEL_BLOCK_SIZE = 20_000
+# Generic outcome distribution used when the model gives no usable probabilities
+DEFAULT_PROBS = np.array([0.4, 0.25, 0.05, 0.01, 0.1, 0.05, 0.14])
+# The stateful engine groups sims by innings score in buckets of this many runs
+STATE_RUN_BUCKET = 5
 
 class MatchSimulator:
-    def __init__(self, model: NeuroPredictor):
+    def __init__(self, model: NeuroPredictor, deliveries=None):
         self.model = model
+        # Outcome distribution used when the model gives no usable probabilities.
+        # deliveries (DataFrame or memory-mapped DeliveryArrays) gives an empirical one.
+        self.fallback_probs = league_outcome_probs(deliveries) if deliveries is not None else DEFAULT_PROBS
         # Outcomes mapping: indices of model.classes_ to real values
         # Assumes model.classes_ are sorted: 0, 1, 2, 3, 4, 6, 7(W)
         self.outcomes_map = {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 5: 6, 6: 'W'} 
@@ -18,65 +42,449 @@ class MatchSimulator:
         start_state: {overs_done, balls_done, wickets_lost, target, current_score, batter, bowler}
         """
         
-        # Basic constraints
-        overs_to_sim = 20 - start_state['overs_done']
-        total_balls = int(overs_to_sim * 6) - start_state['balls_done']
+        total_balls = self._balls_remaining(start_state)
+        
+        if total_balls <= 0:
+            return {'win_prob': 0, 'avg_score': start_state['current_score']}
+
+        base_probs = self._apply_tactics(self._base_probs(start_state), tactical_mods)
+        
+        sim_outcomes = np.random.choice(
+            len(base_probs), 
+            size=(n_sims, total_balls), 
+            p=base_probs
+        )
+        
+        # Map indices to runs/wickets
+        # 0->0, 1->1, 2->2, 3->3, 4->4, 5->6, 6->W (Value 0, but wicket flag)
+        
+        run_map = np.array([0, 1, 2, 3, 4, 6, 0]) 
+        wicket_map = np.array([0, 0, 0, 0, 0, 0, 1])
+        
+        runs_matrix = run_map[sim_outcomes]
+        wickets_matrix = wicket_map[sim_outcomes]
+        
+        # Cumulative Sums
+        cum_runs = runs_matrix.cumsum(axis=1) + start_state['current_score']
+        cum_wickets = wickets_matrix.cumsum(axis=1) + start_state['wickets_lost']
+        
+        # Determine Status
+        # Win if cum_runs > target (for chasing)
+        # All out if cum_wickets >= 10
+        
+        target = start_state.get('target', 9999) # 9999 for first innings
+        
+        final_scores, matches_won = self._resolve_innings(cum_runs, cum_wickets, target)
+
+        win_prob = (matches_won / n_sims) * 100
+        xp_runs = np.mean(final_scores)
+        risk = np.std(final_scores)
+        
+        return {
+            "win_prob": win_prob,
+            "expected_score": xp_runs,
+            "risk_std": risk,
+            "sim_scores": final_scores
+        }
+
+    def simulate_innings_streaming(self, start_state, n_sims=1000, tactical_mods=None,
+                                   chunk_size=None, memory_budget_mb=64, rng=None):
+        """
+        Memory-bounded variant of simulate_innings for very large n_sims.
+        Simulations run in fixed-size chunks using int8/int16 matrices, and win count,
+        mean, std and a score histogram are combined online, so peak memory is set by
+        memory_budget_mb (or an explicit chunk_size) rather than n_sims.
+        Returns the simulate_innings keys except 'sim_scores', plus 'score_bins'/'score_hist'.
+        """
+        total_balls = self._balls_remaining(start_state)
+        
+        if total_balls <= 0:
+            return {'win_prob': 0, 'avg_score': start_state['current_score']}
+
+        base_probs = self._apply_tactics(self._base_probs(start_state), tactical_mods)
+        rng = rng if rng is not None else np.random
+        
+        if chunk_size is None:
+            chunk_size = int(memory_budget_mb * 1024 * 1024) // (total_balls * STREAM_BYTES_PER_BALL)
+        chunk_size = max(1, min(int(chunk_size), n_sims))
+        
+        target = start_state.get('target', 9999) # 9999 for first innings
+        current_score = start_state['current_score']
+        
+        # Scores can only land in [current_score, current_score + 6 * total_balls]
+        score_hist = np.zeros(6 * total_balls + 1, dtype=np.int64)
+        matches_won = 0
+        count, mean, m2 = 0, 0.0, 0.0
+        
+        done = 0
+        while done < n_sims:
+            size = min(chunk_size, n_sims - done)
+            final_scores, won = _simulate_chunk(
+                base_probs, total_balls, current_score, start_state['wickets_lost'], target, size, rng
+            )
+            
+            matches_won += won
+            score_hist += np.bincount(final_scores - current_score, minlength=score_hist.size)
+            
+            # Chan et al. parallel update of running mean / sum of squared deviations
+            chunk_mean = final_scores.mean()
+            chunk_m2 = ((final_scores - chunk_mean) ** 2).sum()
+            delta = chunk_mean - mean
+            total = count + size
+            mean += delta * size / total
+            m2 += chunk_m2 + delta ** 2 * count * size / total
+            count = total
+            
+            done += size
+        
+        return {
+            "win_prob": (matches_won / n_sims) * 100,
+            "expected_score": mean,
+            "risk_std": np.sqrt(m2 / count),
+            "score_bins": np.arange(score_hist.size) + current_score,
+            "score_hist": score_hist,
+            "n_sims": n_sims,
+            "chunk_size": chunk_size
+        }
+
+    def simulate_innings_parallel(self, start_state, n_sims=100_000, tactical_mods=None,
+                                  seed=None, n_workers=None, block_size=PARALLEL_BLOCK_SIZE,
+                                  executor=None, return_scores=True):
+        """
+        Splits one large simulation request across a process pool.
+        The work is cut into fixed blocks of block_size sims, each driven by its own
+        np.random.Generator spawned from SeedSequence(seed), and merged in block order,
+        so results are bit-reproducible for a given seed whatever n_workers is.
+        Pass an existing concurrent.futures executor to avoid pool start-up per call.
+        Returns the simulate_innings keys plus 'score_bins'/'score_hist' and the 'seed' used.
+        """
+        total_balls = self._balls_remaining(start_state)
         
         if total_balls <= 0:
             return {'win_prob': 0, 'avg_score': start_state['current_score']}
 
+        # Model inference happens once here; workers only receive the probability vector
+        base_probs = self._apply_tactics(self._base_probs(start_state), tactical_mods)
+        
+        seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        block_sizes = [min(block_size, n_sims - start) for start in range(0, n_sims, block_size)]
+        block_seeds = seed_seq.spawn(len(block_sizes))
+        
+        job = (
+            base_probs, total_balls, start_state['current_score'], start_state['wickets_lost'],
+            start_state.get('target', 9999) # 9999 for first innings
+        )
+        
+        if executor is not None:
+            blocks = list(executor.map(_simulate_block, [job] * len(block_sizes), block_sizes, block_seeds))
+        elif n_workers == 1 or len(block_sizes) == 1:
+            blocks = list(map(_simulate_block, [job] * len(block_sizes), block_sizes, block_seeds))
+        else:
+            n_workers = min(n_workers or os.cpu_count() or 1, len(block_sizes))
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                blocks = list(pool.map(_simulate_block, [job] * len(block_sizes), block_sizes, block_seeds))
+        
+        # Integer histogram merge is order-independent, so mean/std derived from it are exact
+        score_hist = np.sum([hist for hist, _, _ in blocks], axis=0)
+        matches_won = sum(won for _, won, _ in blocks)
+        score_bins = np.arange(score_hist.size) + start_state['current_score']
+        
+        xp_runs = (score_bins * score_hist).sum() / n_sims
+        risk = np.sqrt((((score_bins - xp_runs) ** 2) * score_hist).sum() / n_sims)
+        
+        results = {
+            "win_prob": (matches_won / n_sims) * 100,
+            "expected_score": xp_runs,
+            "risk_std": risk,
+            "score_bins": score_bins,
+            "score_hist": score_hist,
+            "n_sims": n_sims,
+            "seed": seed_seq.entropy
+        }
+        if return_scores:
+            results["sim_scores"] = np.concatenate([scores for _, _, scores in blocks])
+        return results
+
+    def simulate_tactics(self, start_state, tactics, n_sims=1000, rng=None):
+        """
+        Evaluates several tactical_mods in one vectorized pass.
+        Model probabilities are computed once, and every tactic reuses the same uniform
+        draws mapped through its own inverse CDF (common random numbers), so differences
+        between tactics reflect the tactic rather than sampling noise.
+        tactics: list of tactical_mods dicts (None for baseline).
+        Returns a list of simulate_innings-style result dicts, in the same order.
+        """
+        if self._balls_remaining(start_state) <= 0:
+            return [{'win_prob': 0, 'avg_score': start_state['current_score']} for _ in tactics]
+        return self._simulate_tactics_from_probs(start_state, self._base_probs(start_state), tactics, n_sims, rng)
+
+    def simulate_tactics_batch(self, start_states, tactics, n_sims=1000, rng=None):
+        """
+        simulate_tactics for many independent states (e.g. concurrent API requests):
+        one batched model call covers every state, then each state runs its own
+        vectorized common-random-numbers pass. Returns one result list per state.
+        """
+        live = [i for i, state in enumerate(start_states) if self._balls_remaining(state) > 0]
+        results = [[{'win_prob': 0, 'avg_score': state['current_score']} for _ in tactics] for state in start_states]
+        if not live:
+            return results
+        
+        contexts = [self._context(start_states[i]) for i in live]
+        if hasattr(self.model, 'predict_probs_batch'):
+            raw_probs = self.model.predict_probs_batch(contexts)
+        else:
+            raw_probs = np.array([self.model.predict_probs(context) for context in contexts])
+        base_probs = self._to_standard_probs(raw_probs)
+        
+        for i, probs in zip(live, base_probs):
+            results[i] = self._simulate_tactics_from_probs(start_states[i], probs, tactics, n_sims, rng)
+        return results
+
+    def _simulate_tactics_from_probs(self, start_state, base_probs, tactics, n_sims, rng):
+        total_balls = self._balls_remaining(start_state)
+        probs = np.array([self._apply_tactics(base_probs, mods) for mods in tactics])
+        
+        # Inverse CDF: outcome index = number of cumulative thresholds <= u
+        thresholds = probs.cumsum(axis=1)[:, :-1]
+        rng = rng if rng is not None else np.random
+        uniforms = rng.random((n_sims, total_balls))
+        
+        sim_outcomes = np.zeros((len(tactics), n_sims, total_balls), dtype=np.int8)
+        for k in range(thresholds.shape[1]):
+            sim_outcomes += uniforms >= thresholds[:, k, None, None]
+        del uniforms
+        
+        cum_runs = STREAM_RUN_MAP[sim_outcomes].cumsum(axis=2, dtype=np.int16)
+        cum_runs += start_state['current_score']
+        cum_wickets = STREAM_WICKET_MAP[sim_outcomes].cumsum(axis=2, dtype=np.int16)
+        cum_wickets += start_state['wickets_lost']
+        del sim_outcomes
+        
+        target = start_state.get('target', 9999) # 9999 for first innings
+        
+        results = []
+        for t in range(len(tactics)):
+            final_scores, matches_won = self._resolve_innings(cum_runs[t], cum_wickets[t], target)
+            results.append({
+                "win_prob": (matches_won / n_sims) * 100,
+                "expected_score": np.mean(final_scores),
+                "risk_std": np.std(final_scores),
+                "sim_scores": final_scores
+            })
+        return results
+
+    def simulate_innings_stateful(self, start_state, n_sims=1000, tactical_mods=None, rng=None):
+        """
+        Ball-by-ball Monte Carlo where probabilities follow the match state: over, ball,
+        phase, wickets, the striker (with strike rotation and incoming batters) and the
+        bowler of each over.
+        Extra optional start_state keys:
+          non_striker: batter at the other end
+          batting_order: list of batters still to come in, in order
+          bowling_plan: list of bowlers for the remaining overs (cycled; defaults to [bowler])
+          venue_run_rate / player_form: see _match_context
+        The match-context features follow each sim ball by ball from its running score,
+        wickets and balls (score in STATE_RUN_BUCKET-run buckets, required rate derived from
+        it); venue rate and player form stay at their start values for the rest of the innings.
+        At every ball, sims are grouped by distinct state and the model is queried once for
+        all states not already seen in this run (state -> probabilities is memoized).
+        Returns simulate_innings keys plus 'n_states' and 'n_model_calls'.
+        """
+        total_balls = self._balls_remaining(start_state)
+        
+        if total_balls <= 0:
+            return {'win_prob': 0, 'avg_score': start_state['current_score']}
+
+        rng = rng if rng is not None else np.random
+        target = start_state.get('target', 9999) # 9999 for first innings
+        innings = 2 if start_state.get('target') else 1
+        
+        # Players are tracked as roster indices; running past the roster gives an unknown batter
+        roster = [start_state['batter'], start_state.get('non_striker')] + list(start_state.get('batting_order', []))
+        roster.append(None)
+        unknown_idx = len(roster) - 1
+        bowling_plan = start_state.get('bowling_plan') or [start_state['bowler']]
+        context = self._match_context(start_state)
+        form = start_state.get('player_form') or {}
+        batter_form = [form.get('batter', {}).get(name, CONTEXT_DEFAULTS['batter_form']) for name in roster]
+        chasing = target != 9999
+        
+        striker = np.zeros(n_sims, dtype=np.int16)
+        non_striker = np.ones(n_sims, dtype=np.int16)
+        runs = np.full(n_sims, start_state['current_score'], dtype=np.int32)
+        wickets = np.full(n_sims, start_state['wickets_lost'], dtype=np.int16)
+        new_wickets = np.zeros(n_sims, dtype=np.int16)
+        active = np.ones(n_sims, dtype=bool)
+        
+        prob_cache = {}
+        n_model_calls = 0
+        
+        for b in range(total_balls):
+            idx = np.flatnonzero(active)
+            if idx.size == 0:
+                break
+            
+            ball_no = start_state['balls_done'] + b
+            over = start_state['overs_done'] + ball_no // 6
+            ball = ball_no % 6 + 1
+            bowler = bowling_plan[(ball_no // 6) % len(bowling_plan)]
+            balls_bowled = start_state['overs_done'] * 6 + ball_no
+            bowler_form = form.get('bowler', {}).get(bowler, CONTEXT_DEFAULTS['bowler_form'])
+            
+            # Distinct (score bucket, striker, wickets) among live sims define this ball's states
+            run_bucket = runs[idx].astype(np.int64) // STATE_RUN_BUCKET
+            state_keys = (run_bucket * len(roster) + striker[idx]) * 11 + np.minimum(wickets[idx], 10)
+            uniq_keys, inverse = np.unique(state_keys, return_inverse=True)
+            
+            keys = [(over, ball, bowler, int(k)) for k in uniq_keys]
+            missing = [k for k in keys if k not in prob_cache]
+            if missing:
+                states = []
+                for _, _, _, k in missing:
+                    bucket, rest = divmod(k, len(roster) * 11)
+                    batter_idx, n_wickets = divmod(rest, 11)
+                    score = bucket * STATE_RUN_BUCKET
+                    states.append({
+                        **context,
+                        'over': over,
+                        'ball': ball,
+                        'innings': innings,
+                        'batter': roster[batter_idx],
+                        'bowler': bowler,
+                        'phase': _phase_for_over(over),
+                        'innings_runs': score,
+                        'innings_wickets': n_wickets,
+                        'required_rate': float(required_run_rate(target + 1 - score, balls_bowled)) if chasing else 0.0,
+                        'batter_form': batter_form[batter_idx],
+                        'bowler_form': bowler_form
+                    })
+                # Memoized per run in prob_cache; keep these one-off states out of the model's shared LRU
+                batch_probs = self._to_standard_probs(self.model.predict_probs_batch(states, use_cache=False))
+                n_model_calls += 1
+                for key, probs in zip(missing, batch_probs):
+                    prob_cache[key] = self._apply_tactics(probs, tactical_mods)
+            
+            thresholds = np.array([prob_cache[k] for k in keys]).cumsum(axis=1)[:, :-1]
+            u = rng.random(idx.size)
+            outcome = (u[:, None] >= thresholds[inverse]).sum(axis=1)
+            
+            ball_runs = RUN_MAP[outcome]
+            out = WICKET_MAP[outcome].astype(bool)
+            runs[idx] += ball_runs
+            wickets[idx] += out
+            
+            # Incoming batter takes the dismissed striker's place
+            out_idx = idx[out]
+            new_wickets[out_idx] += 1
+            striker[out_idx] = np.minimum(1 + new_wickets[out_idx], unknown_idx)
+            
+            # Odd runs rotate strike, and so does the end of the over
+            swap = idx[ball_runs % 2 == 1]
+            if ball == 6:
+                swap = np.setdiff1d(idx, swap, assume_unique=True)
+            striker[swap], non_striker[swap] = non_striker[swap], striker[swap].copy()
+            
+            active[idx] = (wickets[idx] < 10) & (runs[idx] <= target)
+        
+        final_scores = runs
+        matches_won = int(np.count_nonzero(final_scores > target)) if target != 9999 else 0
+        
+        return {
+            "win_prob": (matches_won / n_sims) * 100,
+            "expected_score": np.mean(final_scores),
+            "risk_std": np.std(final_scores),
+            "sim_scores": final_scores,
+            "n_states": len(prob_cache),
+            "n_model_calls": n_model_calls
+        }
+
+    def _balls_remaining(self, start_state):
+        overs_to_sim = 20 - start_state['overs_done']
+        return int(overs_to_sim * 6) - start_state['balls_done']
+
+    def _base_probs(self, start_state):
+        """Model outcome probabilities for the current matchup, as the standard 7-class vector."""
         # Get base probabilities from model for current matchup
         # For simplicity in prototype, we'll use a static probability vector 
         # derived from the current batter/bowler for ALL future balls (vectorized approximation)
         # In a full engine, we'd update batter/bowler rotation.
+        raw_probs = self.model.predict_probs(self._context(start_state))
         
-        # Get context
+        return self._to_standard_probs(raw_probs)
+
+    def _context(self, start_state):
+        """Model input state for the current ball of start_state."""
         phase = 'Death' if start_state['overs_done'] > 15 else ('Middle' if start_state['overs_done'] > 6 else 'Powerplay')
         
-        context = {
+        return {
             'over': start_state['overs_done'],
             'ball': start_state['balls_done'],
             'innings': 2 if start_state.get('target') else 1,
             'batter': start_state['batter'],
             'bowler': start_state['bowler'],
-            'phase': phase
+            'phase': phase,
+            **self._match_context(start_state)
         }
-        
-        raw_probs = self.model.predict_probs(context)
+
+    def _match_context(self, start_state):
+        """
+        Match-context features (models.CONTEXT_COLUMNS) for start_state, derived from its
+        running score, wickets, balls and target like data_loader.add_context_features.
+        Optional start_state keys: venue_run_rate, and player_form as returned by
+        data_loader.latest_player_form ({'batter': {name: rate}, 'bowler': {name: rate}});
+        anything missing takes models.CONTEXT_DEFAULTS.
+        """
+        target = start_state.get('target') or 9999
+        balls_bowled = start_state['overs_done'] * 6 + start_state['balls_done']
+        form = start_state.get('player_form') or {}
+        return {
+            'innings_runs': start_state['current_score'],
+            'innings_wickets': start_state['wickets_lost'],
+            # Simulator targets are the score to beat; the chase needs target + 1
+            'required_rate': float(required_run_rate(target + 1 - start_state['current_score'], balls_bowled)) if target != 9999 else 0.0,
+            'venue_run_rate': start_state.get('venue_run_rate', CONTEXT_DEFAULTS['venue_run_rate']),
+            'batter_form': form.get('batter', {}).get(start_state['batter'], CONTEXT_DEFAULTS['batter_form']),
+            'bowler_form': form.get('bowler', {}).get(start_state['bowler'], CONTEXT_DEFAULTS['bowler_form'])
+        }
+
+    def _to_standard_probs(self, raw_probs):
+        """
+        Maps model probabilities (1D for one state, or 2D for a batch of states) onto the
+        standard 7-class vector: 0, 1, 2, 3, 4, 6, 7(W). Rows are normalized.
+        """
+        raw_probs = np.asarray(raw_probs)
+        single = raw_probs.ndim == 1
+        raw_probs = np.atleast_2d(raw_probs)
         
         # Map raw_probs (which might be shape (2,) e.g. [0.9, 0.1] for classes [0, 1])
-        # to standard 7-class vector: 0, 1, 2, 3, 4, 6, 7(W)
-        
-        base_probs = np.zeros(7)
-        if hasattr(self.model.outcome_model, 'classes_'):
-            model_classes = self.model.outcome_model.classes_
-            # outcomes_map keys are model classes, values are real runs/wickets
-            # We need to map model_classes indices to base_probs indices
-            # Standard indices: 0->0, 1->1, 2->2, 3->3, 4->4, 5->6, 6->7(W)
-            
+        base_probs = np.zeros((raw_probs.shape[0], 7))
+        # Predictor-level classes_ first: it avoids loading a lazily-loaded sklearn model
+        model_classes = getattr(self.model, 'classes_', None)
+        if model_classes is None:
+            model_classes = getattr(self.model.outcome_model, 'classes_', None)
+        if model_classes is not None:
             # Outcome to index map
+            # Standard indices: 0->0, 1->1, 2->2, 3->3, 4->4, 5->6, 6->7(W)
             std_outcome_to_idx = {0:0, 1:1, 2:2, 3:3, 4:4, 6:5, 7:6}
             
             for i, cls in enumerate(model_classes):
                 if cls in std_outcome_to_idx:
-                    idx = std_outcome_to_idx[cls]
-                    base_probs[idx] = raw_probs[i]
-        else:
-            # Fallback for some reason
-             base_probs = np.array([0.4, 0.25, 0.05, 0.01, 0.1, 0.05, 0.14]) 
-             
+                    base_probs[:, std_outcome_to_idx[cls]] = raw_probs[:, i]
+        
         # Normalize if sum > 0, else generic fallback
-        if base_probs.sum() > 0:
-            base_probs = base_probs / base_probs.sum()
-        else:
-            base_probs = np.array([0.4, 0.25, 0.05, 0.01, 0.1, 0.05, 0.14])
-
+        fallback = base_probs.sum(axis=1) <= 0
+        base_probs[fallback] = self.fallback_probs
+        base_probs = base_probs / base_probs.sum(axis=1, keepdims=True)
+        
         # Normalize just in case
-        base_probs = base_probs / base_probs.sum()
+        base_probs = base_probs / base_probs.sum(axis=1, keepdims=True)
+        
+        return base_probs[0] if single else base_probs
 
-        # --- Apply Tactical Modifiers ---
+    def _apply_tactics(self, base_probs, tactical_mods):
+        """Applies tactical modifiers to a 7-class probability vector."""
         if tactical_mods:
-            # tactical_mods = {'intent': 'attack', 'field': 'defensive', ...}
+            # tactical_mods = {'intent': 'attack', 'bowler_type': ..., 'batting': 'accelerate', ...}
             if tactical_mods.get('intent') == 'attack':
                 # Increase boundary probs, increase wicket prob
                 # Heuristic: Shift 5% from dots/singles to 4s/6s/W
@@ -87,39 +495,55 @@ class MatchSimulator:
             if tactical_mods.get('bowler_type') == 'yorker_specialist':
                 # More dots (0), maybe more wickets (6), fewer boundaries
                 base_probs = self._adjust_probs(base_probs, boost_indices=[0, 6], penalty_indices=[4, 5], factor=0.10)
+            
+            # Batting-side plans ('intent' above is the fielding side's field setting)
+            if tactical_mods.get('batting') == 'accelerate':
+                # Go after the bowling: dots/1s/2s turn into 4s/6s, at a higher wicket risk
+                base_probs = self._adjust_probs(base_probs, boost_indices=[4, 5, 6], penalty_indices=[0, 1, 2], factor=0.20)
+            elif tactical_mods.get('batting') == 'rotate':
+                # Work the gaps: more 1s/2s, fewer dots, boundaries and wickets
+                base_probs = self._adjust_probs(base_probs, boost_indices=[1, 2], penalty_indices=[0, 4, 5, 6], factor=0.10)
         
-        sim_outcomes = np.random.choice(
-            len(base_probs), 
-            size=(n_sims, total_balls), 
-            p=base_probs
-        )
-        
-        # Map indices to runs/wickets
-        # 0->0, 1->1, 2->2, 3->3, 4->4, 5->6, 6->W (Value 0, but wicket flag)
-        
-        run_map = np.array([0, 1, 2, 3, 4, 6, 0]) 
-        wicket_map = np.array([0, 0, 0, 0, 0, 0, 1])
+        return base_probs
+
+    @staticmethod
+    def _resolve_innings(cum_runs, cum_wickets, target):
+        """
+        Finds where every simulated innings ends, across all sims at once.
+        The innings ends at the earliest of: All Out, Target Chased or Overs Finished.
+        Returns (final_scores ndarray, matches_won).
+        """
+        n_sims, total_balls = cum_runs.shape
+        last_ball = total_balls - 1
         
-        runs_matrix = run_map[sim_outcomes]
-        wickets_matrix = wicket_map[sim_outcomes]
+        # argmax gives the first True per row; rows with no True fall back to the last ball
+        all_out = cum_wickets >= 10
+        w_idx = np.where(all_out.any(axis=1), all_out.argmax(axis=1), last_ball)
         
-        # Cumulative Sums
-        cum_runs = runs_matrix.cumsum(axis=1) + start_state['current_score']
-        cum_wickets = wickets_matrix.cumsum(axis=1) + start_state['wickets_lost']
+        chased = cum_runs > target
+        r_idx = np.where(chased.any(axis=1), chased.argmax(axis=1), last_ball)
         
-        # Determine Status
-        # Win if cum_runs > target (for chasing)
-        # All out if cum_wickets >= 10
+        end_idx = np.minimum(w_idx, r_idx)
+        final_scores = cum_runs[np.arange(n_sims), end_idx]
         
+        if target != 9999:
+            matches_won = int(np.count_nonzero(final_scores > target))
+        else:
+            # In 1st innings, 'win' isn't defined, just score distribution
+            matches_won = 0
+            
+        return final_scores, matches_won
+
+    def _resolve_innings_loop(self, cum_runs, cum_wickets, target):
+        """
+        Reference per-sim implementation of _resolve_innings.
+        Kept for benchmarking and equivalence checks only.
+        """
+        n_sims, total_balls = cum_runs.shape
         matches_won = 0
         final_scores = []
         
-        target = start_state.get('target', 9999) # 9999 for first innings
-        
         for i in range(n_sims):
-            # Find first index where wickets >= 10
-            # or runs > target
-            
             # Wicket limit check
             w_idx = np.argmax(cum_wickets[i] >= 10)
             if cum_wickets[i][w_idx] < 10: w_idx = total_balls - 1 # Survived simulation
@@ -128,31 +552,14 @@ class MatchSimulator:
             r_idx = np.argmax(cum_runs[i] > target)
             if cum_runs[i][r_idx] <= target: r_idx = total_balls - 1 # Didn't chase
             
-            # The match ends at the earlier of: All Out or Target Chased or Overs Finished
             end_idx = min(w_idx, r_idx, total_balls - 1)
-            
             final_runs = cum_runs[i][end_idx]
-            final_wickets = cum_wickets[i][end_idx]
-            
             final_scores.append(final_runs)
             
-            if target != 9999:
-                if final_runs > target:
-                    matches_won += 1
-            else:
-                 # In 1st innings, 'win' isn't defined, just score distribution
-                 pass
-
-        win_prob = (matches_won / n_sims) * 100
-        xp_runs = np.mean(final_scores)
-        risk = np.std(final_scores)
-        
-        return {
-            "win_prob": win_prob,
-            "expected_score": xp_runs,
-            "risk_std": risk,
-            "sim_scores": final_scores
-        }
+            if target != 9999 and final_runs > target:
+                matches_won += 1
+                
+        return final_scores, matches_won
 
     def _adjust_probs(self, probs, boost_indices, penalty_indices, factor):
         """Redistributes probability mass."""
@@ -171,3 +578,134 @@ class MatchSimulator:
             new_probs[idx] += dist_factor
             
         return new_probs / new_probs.sum()
+
+
+def normalize_start_state(start_state):
+    """Copy of start_state with balls_done carried into overs_done (e.g. 6.6 -> 7.0)."""
+    overs, balls = divmod(int(start_state['overs_done']) * 6 + int(start_state['balls_done']), 6)
+    return {**start_state, 'overs_done': overs, 'balls_done': balls}
+
+class TacticResultCache:
+    """
+    Process-wide LRU store of seeded simulate_tactics results, safe to share across threads
+    (e.g. every Streamlit session). Entries are keyed on the normalized start state, one
+    tactic, n_sims and the seed. With common random numbers a tactic's result depends only
+    on that key, so tactics are cached and computed independently of each other.
+    refine() runs a simulation on a background thread, so callers can show a quick low-sim
+    estimate and pick up the converged numbers once they land in the cache.
+    Start states are normalized (normalize_start_state) before keying and simulating, so
+    equivalent over/ball counts share an entry and the result matches what was simulated.
+    """
+    def __init__(self, simulator, maxsize=256, max_workers=1):
+        self.simulator = simulator
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._pending = {}
+        # Re-entrant: a job that is already done runs its done-callback (_forget) immediately
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sim-refine")
+
+    def key(self, start_state, tactical_mods, n_sims, seed):
+        """Hashable cache key; states that simulate identically map to the same key."""
+        start_state = normalize_start_state(start_state)
+        overs, balls = start_state['overs_done'], start_state['balls_done']
+        target = start_state.get('target') or 9999
+        context = self.simulator._match_context(start_state)
+        state = (overs, balls, int(start_state['wickets_lost']), None if target == 9999 else int(target),
+                 int(start_state['current_score']), start_state['batter'], start_state['bowler'],
+                 *(round(float(v), 6) for v in context.values()))
+        mods = tuple(sorted(tactical_mods.items())) if tactical_mods else None
+        return state, mods, int(n_sims), seed
+
+    def get(self, start_state, tactics, n_sims, seed):
+        """{name: result} for the tactics ({name: tactical_mods}) already cached; may be partial."""
+        found = {}
+        with self._lock:
+            for name, mods in tactics.items():
+                key = self.key(start_state, mods, n_sims, seed)
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[name] = self._data[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def simulate(self, start_state, tactics, n_sims, seed):
+        """Cached results for every tactic, simulating the missing ones in one simulate_tactics pass."""
+        start_state = normalize_start_state(start_state)
+        results = self.get(start_state, tactics, n_sims, seed)
+        missing = [name for name in tactics if name not in results]
+        if missing:
+            rng = np.random.default_rng(seed)
+            fresh = self.simulator.simulate_tactics(start_state, [tactics[name] for name in missing], n_sims=n_sims, rng=rng)
+            with self._lock:
+                for name, res in zip(missing, fresh):
+                    self._data[self.key(start_state, tactics[name], n_sims, seed)] = res
+                    results[name] = res
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return {name: results[name] for name in tactics}
+
+    def refine(self, start_state, tactics, n_sims, seed):
+        """
+        Starts simulate() in the background unless everything is cached already.
+        Concurrent requests for the same work share one job. Returns the Future, or None.
+        """
+        job = tuple(self.key(start_state, mods, n_sims, seed) for mods in tactics.values())
+        with self._lock:
+            if all(key in self._data for key in job):
+                return None
+            future = self._pending.get(job)
+            if future is None:
+                future = self._executor.submit(self.simulate, dict(start_state), dict(tactics), n_sims, seed)
+                self._pending[job] = future
+                future.add_done_callback(lambda _: self._forget(job))
+            return future
+
+    def _forget(self, job):
+        with self._lock:
+            self._pending.pop(job, None)
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data),
+                    'maxsize': self.maxsize, 'pending': len(self._pending)}
+
+def _simulate_chunk(base_probs, total_balls, current_score, wickets_lost, target, size, rng):
+    """Simulates `size` innings with compact dtypes. Returns (final_scores int16, matches_won)."""
+    sim_outcomes = rng.choice(len(base_probs), size=(size, total_balls), p=base_probs).astype(np.int8)
+    
+    cum_runs = STREAM_RUN_MAP[sim_outcomes].cumsum(axis=1, dtype=np.int16)
+    cum_runs += current_score
+    cum_wickets = STREAM_WICKET_MAP[sim_outcomes].cumsum(axis=1, dtype=np.int16)
+    cum_wickets += wickets_lost
+    del sim_outcomes
+    
+    return MatchSimulator._resolve_innings(cum_runs, cum_wickets, target)
+
+
+def _simulate_block(job, size, seed_seq):
+    """Process-pool worker: one reproducible block of sims. Returns (score_hist, matches_won, final_scores)."""
+    base_probs, total_balls, current_score, wickets_lost, target = job
+    rng = np.random.default_rng(seed_seq)
+    
+    final_scores, won = _simulate_chunk(base_probs, total_balls, current_score, wickets_lost, target, size, rng)
+    score_hist = np.bincount(final_scores - current_score, minlength=6 * total_balls + 1)
+    return score_hist, won, final_scores
+
+
+def _phase_for_over(over):
+    """Match phase for a 0-based over number, using the same bins as data_loader.process_data."""
+    if over <= 5:
+        return 'Powerplay'
+    return 'Middle' if over <= 15 else 'Death'
+
+
+def league_outcome_probs(deliveries):
+    """Empirical 7-class outcome distribution (0, 1, 2, 3, 4, 6, W) over a deliveries table."""
+    outcomes = encode_outcomes(deliveries['runs_batter'], deliveries['is_wicket'])
+    counts = np.bincount(outcomes, minlength=8)[[0, 1, 2, 3, 4, 6, 7]].astype(float)
+    return counts / counts.sum() if counts.sum() > 0 else DEFAULT_PROBS
@@ -0,0 +1,158 @@
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.data_loader import PROCESSED_DIR, delivery_flags
+
+# Config
+STATS_INDEX_PATH = PROCESSED_DIR / "stats_index.pkl"
+
+BATTING_METRICS = ['runs', 'balls', 'dismissals', 'dots', 'fours', 'sixes']
+BOWLING_METRICS = ['runs_conceded', 'balls', 'wickets', 'dots', 'fours', 'sixes']
+
+# table name -> (group keys, metric family)
+TABLES = {
+    'batter': (['batter'], 'batting'),
+    'batter_phase': (['batter', 'phase'], 'batting'),
+    'batter_venue': (['batter', 'venue'], 'batting'),
+    'bowler': (['bowler'], 'bowling'),
+    'bowler_phase': (['bowler', 'phase'], 'bowling'),
+    'bowler_venue': (['bowler', 'venue'], 'bowling'),
+    'head_to_head': (['batter', 'bowler'], 'batting'),
+}
+
+def _metric_frame(df):
+    """Per-delivery metric columns, computed column-wise (legal-delivery aware)."""
+    flags = delivery_flags(df)
+    runs_batter = np.asarray(df['runs_batter'])
+    is_wicket = np.asarray(df['is_wicket'])
+    return {
+        'batting': pd.DataFrame({
+            'runs': runs_batter,
+            'balls': flags['faced'],
+            'dismissals': is_wicket,
+            'dots': flags['faced'] & (runs_batter == 0),
+            'fours': runs_batter == 4,
+            'sixes': runs_batter == 6
+        }, index=df.index).astype(np.int64),
+        'bowling': pd.DataFrame({
+            'runs_conceded': flags['bowler_runs'],
+            'balls': flags['legal'],
+            'wickets': is_wicket,
+            'dots': flags['legal'] & (flags['bowler_runs'] == 0),
+            'fours': runs_batter == 4,
+            'sixes': runs_batter == 6
+        }, index=df.index).astype(np.int64)
+    }
+
+def build_aggregates(df):
+    """Aggregates a deliveries frame into every index table (one groupby per table)."""
+    metrics = _metric_frame(df)
+    tables = {}
+    for name, (keys, family) in TABLES.items():
+        key_cols = [pd.Series(df[k], index=df.index).astype(str) for k in keys]
+        tables[name] = _drop_empty(metrics[family].groupby(key_cols).sum())
+    return tables
+
+def _drop_empty(table):
+    return table[(table != 0).any(axis=1)]
+
+class StatsIndex:
+    """
+    Persisted career / per-phase / per-venue / batter-vs-bowler aggregates.
+    Tables are updated incrementally by adding aggregates of new deliveries and
+    subtracting those of removed ones; lookups are dict-backed O(1).
+    """
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self._build_lookup()
+
+    @classmethod
+    def from_deliveries(cls, df):
+        return cls(build_aggregates(df))
+
+    def update(self, added=None, removed=None):
+        """Applies newly ingested (added) and dropped (removed) deliveries."""
+        for frame, sign in ((added, 1), (removed, -1)):
+            if frame is None or len(frame) == 0:
+                continue
+            for name, delta in build_aggregates(frame).items():
+                table = self.tables.get(name)
+                if table is None:
+                    table = delta.iloc[0:0]
+                table = table.add(sign * delta, fill_value=0).astype(np.int64)
+                self.tables[name] = _drop_empty(table)
+        self._build_lookup()
+
+    def _build_lookup(self):
+        self._lookup = {
+            name: dict(zip(table.index, table.to_numpy()))
+            for name, table in self.tables.items()
+        }
+
+    def _get(self, name, key):
+        row = self._lookup.get(name, {}).get(key)
+        if row is None:
+            return None
+        family = TABLES[name][1]
+        stats = dict(zip(BATTING_METRICS if family == 'batting' else BOWLING_METRICS, row.tolist()))
+        return _with_rates(stats, family)
+
+    def batter(self, name):
+        return self._get('batter', name)
+
+    def bowler(self, name):
+        return self._get('bowler', name)
+
+    def batter_phase(self, name, phase):
+        return self._get('batter_phase', (name, phase))
+
+    def bowler_phase(self, name, phase):
+        return self._get('bowler_phase', (name, phase))
+
+    def batter_venue(self, name, venue):
+        return self._get('batter_venue', (name, venue))
+
+    def bowler_venue(self, name, venue):
+        return self._get('bowler_venue', (name, venue))
+
+    def head_to_head(self, batter, bowler):
+        return self._get('head_to_head', (batter, bowler))
+
+    def top_batters(self, n=50, by='runs'):
+        table = self.tables.get('batter')
+        return [] if table is None else table[by].nlargest(n).index.tolist()
+
+    def top_bowlers(self, n=50, by='wickets'):
+        table = self.tables.get('bowler')
+        return [] if table is None else table[by].nlargest(n).index.tolist()
+
+    def save(self, path=STATS_INDEX_PATH):
+        path = Path(path)
+        tmp_path = path.with_suffix(".tmp")
+        pd.to_pickle(self.tables, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATS_INDEX_PATH):
+        return cls(pd.read_pickle(path))
+
+def _with_rates(stats, family):
+    balls = max(1, stats['balls'])
+    if family == 'batting':
+        stats['strike_rate'] = stats['runs'] / balls * 100
+        stats['avg'] = stats['runs'] / max(1, stats['dismissals'])
+    else:
+        stats['economy'] = stats['runs_conceded'] / balls * 6
+    stats['dot_pct'] = stats['dots'] / balls * 100
+    return stats
+
+def load_stats_index(df=None, path=STATS_INDEX_PATH):
+    """Loads the persisted index, building (and saving) it from df if it does not exist yet."""
+    if Path(path).exists():
+        return StatsIndex.load(path)
+    if df is None:
+        return StatsIndex()
+    index = StatsIndex.from_deliveries(df)
+    index.save(path)
+    return index
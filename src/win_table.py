@@ -0,0 +1,165 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from pathlib import Path
+from src.data_loader import PROCESSED_DIR
+from src.simulator import RUN_MAP, WICKET_MAP, DEFAULT_PROBS, _phase_for_over, league_outcome_probs
+
+# Config
+WIN_TABLE_PATH = PROCESSED_DIR / "win_table.npz"
+MAX_BALLS = 120
+MAX_WICKETS = 10
+MAX_RUNS = 300
+PHASES = ('Powerplay', 'Middle', 'Death')
+
+def phase_outcome_probs(deliveries):
+    """Per-phase 7-class outcome distributions (league scoring profile for each phase)."""
+    if deliveries is None or len(deliveries) == 0 or 'phase' not in deliveries:
+        return default_phase_probs()
+    phase = np.asarray(deliveries['phase']).astype(str)
+    profiles = {}
+    for name in PHASES:
+        mask = phase == name
+        profiles[name] = league_outcome_probs({
+            'runs_batter': np.asarray(deliveries['runs_batter'])[mask],
+            'is_wicket': np.asarray(deliveries['is_wicket'])[mask]
+        }) if mask.any() else DEFAULT_PROBS
+    return profiles
+
+def default_phase_probs():
+    return {phase: DEFAULT_PROBS for phase in PHASES}
+
+def build_win_table(phase_probs=None, max_balls=MAX_BALLS, max_runs=MAX_RUNS):
+    """
+    Chase win probability and expected runs still to come for every
+    (balls remaining, wickets lost, runs needed) state.
+    Uses the simulator's ball model (RUN_MAP / WICKET_MAP, one outcome distribution
+    per phase) and solves it exactly by backward induction over balls remaining,
+    so every cell is the limit MatchSimulator's Monte Carlo converges to.
+    Returns (win_prob, expected_runs), each shaped (max_balls + 1, 10, max_runs + 1).
+    """
+    phase_probs = phase_probs or default_phase_probs()
+    win = np.zeros((max_balls + 1, MAX_WICKETS, max_runs + 1))
+    exp_runs = np.zeros_like(win)
+    win[:, :, 0] = 1.0  # nothing needed: already won
+
+    needed = np.arange(max_runs + 1)
+    for balls in range(1, max_balls + 1):
+        over = max(0, MAX_BALLS - balls) // 6
+        probs = np.asarray(phase_probs[_phase_for_over(over)], dtype=float)
+        probs = probs / probs.sum()
+
+        # Previous layer with an "all out" row appended (no win, no more runs)
+        prev_win = np.vstack([win[balls - 1], np.zeros((1, max_runs + 1))])
+        prev_exp = np.vstack([exp_runs[balls - 1], np.zeros((1, max_runs + 1))])
+        for p, runs, is_wicket in zip(probs, RUN_MAP, WICKET_MAP):
+            rows = np.arange(MAX_WICKETS) + is_wicket
+            cols = np.maximum(needed - runs, 0)
+            win[balls] += p * prev_win[rows][:, cols]
+            exp_runs[balls] += p * (runs + prev_exp[rows][:, cols])
+
+        win[balls, :, 0] = 1.0
+        exp_runs[balls, :, 0] = 0.0
+    return win, exp_runs
+
+class WinTable:
+    """Precomputed chase table served by bilinear interpolation over balls and runs."""
+    def __init__(self, win_prob, expected_runs, phase_probs=None):
+        self.win_prob = win_prob
+        self.expected_runs = expected_runs
+        self.phase_probs = phase_probs or {}
+
+    @classmethod
+    def build(cls, phase_probs=None):
+        phase_probs = phase_probs or default_phase_probs()
+        return cls(*build_win_table(phase_probs), phase_probs=phase_probs)
+
+    def lookup(self, balls_remaining, wickets_lost, runs_needed):
+        """
+        Returns (win_prob %, expected further runs); scalars or arrays.
+        Fractional balls / runs are interpolated, out-of-range inputs are clipped.
+        """
+        if np.isscalar(balls_remaining) and np.isscalar(wickets_lost) and np.isscalar(runs_needed):
+            return self._lookup_scalar(balls_remaining, wickets_lost, runs_needed)
+        max_balls = self.win_prob.shape[0] - 1
+        max_runs = self.win_prob.shape[2] - 1
+        b = np.clip(np.asarray(balls_remaining, dtype=float), 0, max_balls)
+        r = np.clip(np.asarray(runs_needed, dtype=float), 0, max_runs)
+        w = np.clip(np.asarray(wickets_lost), 0, MAX_WICKETS - 1).astype(np.intp)
+
+        b0, r0 = np.floor(b).astype(np.intp), np.floor(r).astype(np.intp)
+        b1, r1 = np.minimum(b0 + 1, max_balls), np.minimum(r0 + 1, max_runs)
+        tb, tr = b - b0, r - r0
+
+        def interp(table):
+            return ((1 - tb) * ((1 - tr) * table[b0, w, r0] + tr * table[b0, w, r1])
+                    + tb * ((1 - tr) * table[b1, w, r0] + tr * table[b1, w, r1]))
+
+        win_prob = interp(self.win_prob) * 100
+        expected = interp(self.expected_runs)
+        # All out or out of balls with runs still needed -> lost
+        done = (np.asarray(wickets_lost) >= MAX_WICKETS) | ((b <= 0) & (r > 0))
+        win_prob = np.where(done, 0.0, win_prob)
+        expected = np.where(done, 0.0, expected)
+        return win_prob, expected
+
+    def _lookup_scalar(self, balls_remaining, wickets_lost, runs_needed):
+        """Same as lookup() for one state, without array overhead."""
+        max_balls = self.win_prob.shape[0] - 1
+        max_runs = self.win_prob.shape[2] - 1
+        b = min(max(float(balls_remaining), 0.0), max_balls)
+        r = min(max(float(runs_needed), 0.0), max_runs)
+        if wickets_lost >= MAX_WICKETS or (b <= 0 and r > 0):
+            return 0.0, 0.0
+        w = max(int(wickets_lost), 0)
+        b0, r0 = int(b), int(r)
+        b1, r1 = min(b0 + 1, max_balls), min(r0 + 1, max_runs)
+        tb, tr = b - b0, r - r0
+
+        def interp(table):
+            low, high = table[b0, w], table[b1, w]
+            return float((1 - tb) * ((1 - tr) * low[r0] + tr * low[r1])
+                         + tb * ((1 - tr) * high[r0] + tr * high[r1]))
+
+        return interp(self.win_prob) * 100, interp(self.expected_runs)
+
+    def lookup_state(self, start_state):
+        """Table estimate for a simulator start_state (2nd innings), in simulate_innings' result keys."""
+        balls = 120 - (start_state['overs_done'] * 6 + start_state['balls_done'])
+        runs_needed = start_state['target'] + 1 - start_state['current_score']
+        win_prob, expected = self.lookup(balls, start_state['wickets_lost'], runs_needed)
+        return {'win_prob': win_prob, 'expected_score': start_state['current_score'] + expected}
+
+    def save(self, path=WIN_TABLE_PATH):
+        path = Path(path)
+        phases = list(self.phase_probs)
+        np.savez(path,
+                 win_prob=self.win_prob.astype(np.float32),
+                 expected_runs=self.expected_runs.astype(np.float32),
+                 phases=np.array(phases),
+                 phase_probs=np.array([self.phase_probs[p] for p in phases], dtype=float).reshape(len(phases), -1))
+
+    @classmethod
+    def load(cls, path=WIN_TABLE_PATH):
+        with np.load(path) as data:
+            phase_probs = dict(zip(data['phases'].tolist(), data['phase_probs']))
+            return cls(data['win_prob'], data['expected_runs'], phase_probs)
+
+def load_win_table(path=WIN_TABLE_PATH):
+    """Loads the precomputed table, or None if it has not been built yet."""
+    return WinTable.load(path) if Path(path).exists() else None
+
+def build_and_save(deliveries=None, path=WIN_TABLE_PATH):
+    """Offline pipeline: phase profiles from the processed store -> table -> array file."""
+    if deliveries is None:
+        from src.data_loader import load_deliveries
+        deliveries = load_deliveries(columns=['runs_batter', 'is_wicket', 'phase'])
+    table = WinTable.build(phase_outcome_probs(deliveries))
+    table.save(path)
+    print(f"Saved win table {table.win_prob.shape} to {path}")
+    return table
+
+if __name__ == "__main__":
+    build_and_save()
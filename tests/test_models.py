@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from src.benchmarks import _synthetic_deliveries
+from src.models import NeuroPredictor, CategoryEncoder, MIN_PLAYER_DELIVERIES, encode_outcomes
+
+
+def encode_outcome(row):
+    """The row-wise labelling prepare_data used before encode_outcomes."""
+    if row['is_wicket']: return 7
+    if row['runs_batter'] == 6: return 6
+    if row['runs_batter'] == 4: return 4
+    if row['runs_batter'] == 3: return 3
+    if row['runs_batter'] == 2: return 2
+    if row['runs_batter'] == 1: return 1
+    return 0
+
+
+def test_encode_outcomes_matches_row_wise_mapping():
+    # runs_batter, extras_wides, extras_noballs, is_wicket
+    rows = [
+        (0, 0, 0, 0),  # dot
+        (1, 0, 0, 0), (2, 0, 0, 0), (3, 0, 0, 0),
+        (4, 0, 0, 0), (6, 0, 0, 0),
+        (5, 0, 0, 0),  # five (overthrows) -> 0
+        (0, 1, 0, 0),  # wide
+        (0, 5, 0, 0),  # wide to the boundary
+        (0, 1, 0, 1),  # stumped off a wide
+        (0, 0, 1, 0),  # no-ball
+        (4, 0, 1, 0),  # four off a no-ball
+        (6, 0, 1, 0),  # six off a no-ball
+        (1, 0, 1, 1),  # run out going for a run off a no-ball
+        (0, 0, 0, 1),  # bowled
+        (1, 0, 0, 1),  # run out completing a single
+        (4, 0, 0, 1),
+    ]
+    df = pd.DataFrame(rows, columns=['runs_batter', 'extras_wides', 'extras_noballs', 'is_wicket']).astype('int8')
+    rng = np.random.default_rng(0)
+    df = pd.concat([df, pd.DataFrame({
+        'runs_batter': rng.choice([0, 1, 2, 3, 4, 5, 6], 5000),
+        'extras_wides': rng.choice([0, 1], 5000, p=[0.95, 0.05]),
+        'extras_noballs': rng.choice([0, 1], 5000, p=[0.98, 0.02]),
+        'is_wicket': rng.choice([0, 1], 5000, p=[0.95, 0.05]),
+    }).astype('int8')], ignore_index=True)
+
+    expected = df.apply(encode_outcome, axis=1).to_numpy()
+    got = encode_outcomes(df['runs_batter'], df['is_wicket'])
+    np.testing.assert_array_equal(got, expected)
+    assert got.dtype == np.int8
+    assert set(got) == {0, 1, 2, 3, 4, 6, 7}
+
+
+def test_encoder_folds_rare_values_into_unknown_code():
+    values = ['a'] * 5 + ['b'] * 3 + ['c']
+    enc = CategoryEncoder().fit(values, min_count=2)
+    assert enc.classes_ == ['a', 'b']
+    assert enc.encode('c') == enc.unknown_code == enc.encode('never seen')
+
+    # unknown_share folds the least frequent values even when none are below min_count
+    enc = CategoryEncoder().fit(values, unknown_share=0.4)
+    assert enc.classes_ == ['a']
+
+
+def test_unknown_player_does_not_copy_a_known_player():
+    df = _synthetic_deliveries(n_matches=60, n_batters=120, n_bowlers=80)
+    model = NeuroPredictor(backend='forest')
+    model.train(df)
+
+    # The unknown code is trained on real (rare-player) deliveries
+    X, _ = model.prepare_data(df)
+    assert (X['batter_code'] == 0).any()
+    assert len(model.enc_batter.classes_) < df['batter'].nunique()
+
+    state = {'over': 17, 'ball': 3, 'innings': 2, 'bowler': 'bowler_1', 'phase': 'Death'}
+    known = model.predict_probs_batch([{**state, 'batter': b} for b in model.enc_batter.classes_])
+    unknown = model.predict_probs({**state, 'batter': 'Debutant Nobody'})
+    assert not np.isclose(known, unknown).all(axis=1).any()
+    # Compiled and sklearn paths agree on the unknown player
+    row = np.array([model._encode_state({**state, 'batter': 'Debutant Nobody'})])
+    np.testing.assert_allclose(model.outcome_model.predict_proba(row)[0], unknown)